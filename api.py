@@ -0,0 +1,264 @@
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, url_for
+from sqlalchemy import select, tuple_
+
+from models import (Area, Artist, Genre, Show, Venue, artist_genres, db,
+                    venue_genres)
+from scheduling import (daily_totals, month_calendar, parse_calendar_args,
+                        parse_month, show_filters)
+from search import escape_like
+from utils import decode_cursor, encode_cursor
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+class ApiResource:
+    """Columns a JSON resource exposes and how to page through them.
+
+    ``fields`` maps each public field name to a column, plus the join
+    condition when that column lives on another table. Only
+    the requested fields are selected, as plain rows rather than ORM
+    objects. ``genres`` is the optional association table that backs a
+    ``genres`` field, loaded with one extra query per page, and
+    ``search`` the column that ``?q=`` filters on.
+    """
+
+    def __init__(self, model, fields, default_fields, genres=None,
+                 search=None):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.genres = genres
+        self.search = search
+
+    @property
+    def field_names(self):
+        return tuple(self.fields) + (('genres',) if self.genres is not None
+                                     else ())
+
+    def key_columns(self):
+        return (self.model.id,)
+
+    def cursor(self, row):
+        return str(row.id)
+
+    def decode(self, cursor):
+        try:
+            return (int(cursor),) if cursor else None
+        except ValueError:
+            return None
+
+    def filters(self, args):
+        return []
+
+    def select(self, names):
+        """Select the key columns plus ``names``, with only needed joins."""
+        columns = {column.key: column for column in self.key_columns()}
+        joins = {}
+        for name in names:
+            column, onclause = self.fields[name]
+            if name not in columns:
+                columns[name] = column.label(name)
+            if onclause is not None:
+                joins.setdefault(column.class_, onclause)
+        stmt = select(*columns.values()).select_from(self.model)
+        for target, onclause in joins.items():
+            stmt = stmt.join(target, onclause)
+        return stmt
+
+    def load_genres(self, ids):
+        owner = self.genres.c[f'{self.model.__tablename__}_id']
+        names = {}
+        rows = db.session.execute(
+            select(owner, Genre.name).join(
+                Genre, Genre.id == self.genres.c.genre_id
+            ).where(owner.in_(ids)).order_by(owner, Genre.name))
+        for owner_id, genre in rows:
+            names.setdefault(owner_id, []).append(genre)
+        return names
+
+
+class ShowResource(ApiResource):
+    """Shows page through ``(start_time, id)`` like the ``/shows`` listing."""
+
+    def key_columns(self):
+        return (Show.start_time, Show.id)
+
+    def cursor(self, row):
+        return encode_cursor(row.start_time, row.id)
+
+    def decode(self, cursor):
+        return decode_cursor(cursor)
+
+    def filters(self, args):
+        """``from``/``to``, ``city``/``state`` and ``genre`` filters."""
+        return show_filters(**parse_calendar_args(args))
+
+
+RESOURCES = {
+    'venues': ApiResource(Venue, {
+        'id': (Venue.id, None),
+        'name': (Venue.name, None),
+        'city': (Area.city, Venue.area_id == Area.id),
+        'state': (Area.state, Venue.area_id == Area.id),
+        'address': (Venue.address, None),
+        'phone': (Venue.phone, None),
+        'website': (Venue.website, None),
+        'image_link': (Venue.image_link, None),
+        'facebook_link': (Venue.facebook_link, None),
+        'seeking_talent': (Venue.seeking_talent, None),
+        'seeking_description': (Venue.seeking_description, None),
+        'updated_at': (Venue.updated_at, None),
+        'upcoming_show_count': (Venue.upcoming_show_count, None),
+        'past_show_count': (Venue.past_show_count, None),
+        'next_show_at': (Venue.next_show_at, None),
+    }, default_fields=('id', 'name', 'city', 'state'), genres=venue_genres,
+        search=Venue.name),
+    'artists': ApiResource(Artist, {
+        'id': (Artist.id, None),
+        'name': (Artist.name, None),
+        'city': (Area.city, Artist.area_id == Area.id),
+        'state': (Area.state, Artist.area_id == Area.id),
+        'phone': (Artist.phone, None),
+        'website': (Artist.website, None),
+        'image_link': (Artist.image_link, None),
+        'facebook_link': (Artist.facebook_link, None),
+        'seeking_venue': (Artist.seeking_venue, None),
+        'seeking_description': (Artist.seeking_description, None),
+        'updated_at': (Artist.updated_at, None),
+        'upcoming_show_count': (Artist.upcoming_show_count, None),
+        'past_show_count': (Artist.past_show_count, None),
+        'next_show_at': (Artist.next_show_at, None),
+    }, default_fields=('id', 'name', 'city', 'state'), genres=artist_genres,
+        search=Artist.name),
+    'shows': ShowResource(Show, {
+        'id': (Show.id, None),
+        'start_time': (Show.start_time, None),
+        'end_time': (Show.end_time, None),
+        'venue_id': (Show.venue_id, None),
+        'venue_name': (Venue.name, Show.venue_id == Venue.id),
+        'artist_id': (Show.artist_id, None),
+        'artist_name': (Artist.name, Show.artist_id == Artist.id),
+        'artist_image_link': (Artist.image_link, Show.artist_id == Artist.id),
+    }, default_fields=('id', 'start_time', 'venue_id', 'venue_name',
+                       'artist_id', 'artist_name')),
+}
+
+
+def _json(payload, status=200):
+    return Response(json.dumps(payload, separators=(',', ':')),
+                    status=status, mimetype='application/json')
+
+
+def _error(message, status):
+    return _json({'error': message}, status)
+
+
+def _requested_fields(resource):
+    """Parse ``?fields=a,b`` into a tuple of names, or return an error."""
+    raw = request.args.get('fields')
+    if not raw:
+        return resource.default_fields, None
+    names = tuple(dict.fromkeys(
+        name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in resource.field_names]
+    if unknown:
+        return None, _error(
+            f'Unknown fields: {", ".join(unknown)}. Available: '
+            f'{", ".join(resource.field_names)}', 400)
+    return names, None
+
+
+def _page_size():
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'],
+                             type=int)
+    return min(max(limit, 1), current_app.config['API_MAX_PAGE_SIZE'])
+
+
+def _records(resource, rows, names):
+    """Turn rows into dicts holding exactly the requested fields."""
+    columns = [name for name in names if name != 'genres']
+    records = []
+    for row in rows:
+        record = {}
+        for name in columns:
+            value = getattr(row, name)
+            record[name] = (value.isoformat()
+                            if isinstance(value, datetime) else value)
+        records.append(record)
+    if 'genres' in names:
+        genres = resource.load_genres([row.id for row in rows])
+        for row, record in zip(rows, records):
+            record['genres'] = genres.get(row.id, [])
+    return records
+
+
+@api.route('/<any(venues, artists, shows):kind>')
+def list_resources(kind):
+    resource = RESOURCES[kind]
+    names, error = _requested_fields(resource)
+    if error:
+        return error
+    try:
+        filters = resource.filters(request.args)
+    except ValueError:
+        return _error('Dates must be ISO formatted, e.g. 2026-10-18', 400)
+    limit = _page_size()
+    key = resource.key_columns()
+    stmt = resource.select(
+        [name for name in names if name != 'genres']
+    ).where(*filters).order_by(*key).limit(limit + 1)
+    after = resource.decode(request.args.get('after'))
+    if after is not None:
+        stmt = stmt.where(tuple_(*key) > tuple_(*after))
+    term = request.args.get('q', '').strip()
+    if term and resource.search is not None:
+        # Served by the trigram indexes on PostgreSQL.
+        stmt = stmt.where(resource.search.ilike(f'%{escape_like(term)}%',
+                                                escape='\\'))
+    rows = db.session.execute(stmt).all()
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        args = dict(request.args, after=resource.cursor(rows[-1]))
+        next_url = url_for('.list_resources', kind=kind, **args)
+    return _json({'data': _records(resource, rows, names), 'next': next_url})
+
+
+@api.route('/<any(venues, artists, shows):kind>/<int:resource_id>')
+def get_resource(kind, resource_id):
+    resource = RESOURCES[kind]
+    names, error = _requested_fields(resource)
+    if error:
+        return error
+    row = db.session.execute(
+        resource.select([name for name in names if name != 'genres']).where(
+            resource.model.id == resource_id)
+    ).first()
+    if row is None:
+        return _error(f'{kind[:-1].capitalize()} {resource_id} not found', 404)
+    return _json({'data': _records(resource, [row], names)[0]})
+
+
+@api.route('/calendar')
+def calendar_totals():
+    """Per-day show, venue and artist counts for a month or a date range."""
+    try:
+        filters = parse_calendar_args(request.args)
+        month = request.args.get('month')
+        if month:
+            area = {key: filters[key] for key in ('city', 'state', 'genre')}
+            totals = month_calendar(*parse_month(month), **area)
+        elif filters['start'] and filters['end']:
+            totals = daily_totals(show_filters(**filters))
+        else:
+            return _error('Pass month=YYYY-MM or both from and to', 400)
+    except ValueError:
+        return _error('Dates must be ISO formatted, e.g. 2026-10-18', 400)
+    return _json({'days': [
+        {'date': day.isoformat(), 'shows': shows, 'venues': venues,
+         'artists': artists}
+        for day, (shows, venues, artists) in sorted(totals.items())]})
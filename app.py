@@ -1,32 +1,208 @@
 # ----------------------------------------------------------------------------#
 # Imports
 # ----------------------------------------------------------------------------#
+import calendar
 import logging
-import secrets
+import math
+import os
+import weakref
+from datetime import date, datetime, timedelta
 from logging import FileHandler, Formatter
 
-from flask import (Flask, flash, jsonify, redirect, render_template, request,
+from flask import (Blueprint, Flask, Response, abort, current_app, flash,
+                   jsonify, redirect, render_template, request,
+                   send_from_directory, stream_template, stream_with_context,
                    url_for)
 from flask_migrate import Migrate
-from sqlalchemy import or_
+from sqlalchemy.engine import make_url
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-
+from sqlalchemy.orm import load_only, selectinload
+
+from api import api
+from assets import init_assets, register_asset_commands, send_asset
+from cache import (cached, conditional, get_page_cache, init_page_cache,
+                   warm_later)
+from compression import init_compression
+from export import EXPORT_FORMATS, show_catalogue_batches
 from filters import register_template_filters
-from forms import ArtistForm, ShowForm, VenueForm
-from models import Area, Artist, Show, Venue, db
-from utils import get_or_create_area, get_or_create_genre
+from forms import ArtistForm, GenreEnum, ShowForm, VenueForm
+from images import THUMBNAIL_NAME, register_image_commands
+from importer import register_import_command
+from instrumentation import init_query_stats
+from jobs import register_job_commands
+from metrics import InstrumentedQueuePool, init_metrics, render_metrics
+from models import PAST_SHOWS_PER_PAGE, Area, Artist, Show, Venue, db
+from scheduling import (month_calendar, parse_calendar_args, parse_month,
+                        register_schedule_commands, show_filters,
+                        shows_between)
+from search import get_search, init_search
+from suggest import SUGGEST_MODELS, init_suggest, suggest
+from utils import (decode_cursor, encode_cursor, get_or_create_area,
+                   get_or_create_genres)
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-app.config.from_object('config')
-app.config['SECRET_KEY'] = secrets.token_urlsafe(32)
-register_template_filters(app)
-db.init_app(app)
+migrate = Migrate()
+bp = Blueprint('main', __name__)
+
+THUMBNAIL_MAX_AGE = 365 * 24 * 3600
+
+
+def engine_options(config):
+    """Pool and timeout settings for the configured database.
+
+    SQLite uses its own single-file pools, so the pool tuning and the
+    PostgreSQL statement timeout only apply to server databases.
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        return options
+    options.setdefault('poolclass', InstrumentedQueuePool)
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    if url.get_backend_name() == 'postgresql':
+        timeout = config['DB_STATEMENT_TIMEOUT_MS']
+        options.setdefault('connect_args', {}).setdefault(
+            'options', f'-c statement_timeout={timeout}')
+    return options
+
+
+# Apps whose pooled connections are dropped in forked children. Held weakly
+# so apps built by tests or scripts can still be collected.
+_FORK_APPS = weakref.WeakSet()
+_fork_handler_registered = False
+
+
+def _dispose_forked_engines():
+    for app in list(_FORK_APPS):
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def dispose_engines_after_fork(app):
+    """Drop pooled connections inherited from a pre-forking master.
+
+    Connections opened before a gunicorn/uwsgi fork would otherwise be
+    shared by every worker. ``close=False`` leaves the parent's sockets
+    alone and only forgets them in the child. A single fork handler is
+    registered per process; it covers every live app.
+    """
+    global _fork_handler_registered
+    if not _fork_handler_registered:
+        os.register_at_fork(after_in_child=_dispose_forked_engines)
+        _fork_handler_registered = True
+    _FORK_APPS.add(app)
+
+
+def register_error_logging(app):
+    if app.debug or app.testing:
+        return
+    file_handler = FileHandler('error.log')
+    file_handler.setFormatter(
+        Formatter(
+            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    )
+    app.logger.setLevel(logging.INFO)
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.info('errors')
 
-migrate = Migrate(app, db)
+
+def create_app(config='config'):
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    register_template_filters(app)
+    init_assets(app)
+    init_compression(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    init_search(app)
+    init_suggest(app)
+    init_page_cache(app)
+    init_query_stats(app)
+    init_metrics(app)
+    register_import_command(app)
+    register_schedule_commands(app)
+    register_job_commands(app)
+    register_image_commands(app)
+    register_asset_commands(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api)
+    register_error_logging(app)
+    dispose_engines_after_fork(app)
+    return app
+
+
+# ----------------------------------------------------------------------------#
+# Helpers.
+# ----------------------------------------------------------------------------#
+
+def show_schedule(owner):
+    """Template context with the upcoming/past shows of a venue or artist."""
+    now = datetime.now()
+    upcoming_count, past_count = owner.show_counts(now)
+    past_pages = math.ceil(past_count / PAST_SHOWS_PER_PAGE)
+    # Out of range pages, however large, show the nearest existing one.
+    past_page = min(max(request.args.get('past_page', 1, type=int), 1),
+                    max(past_pages, 1))
+    return {
+        'upcoming_shows': owner.upcoming_shows(now) if upcoming_count else [],
+        'upcoming_count': upcoming_count,
+        'past_shows': owner.past_shows(past_page, now=now) if past_count else [],
+        'past_count': past_count,
+        'past_page': past_page,
+        'past_pages': past_pages,
+    }
+
+
+def stream_page(template_name, **context):
+    """Render a template as it is sent, in chunks of STREAM_CHUNK_SIZE.
+
+    The data should already be loaded, so a database error still turns
+    into a regular error page rather than a truncated one.
+    """
+    def chunks(parts, size):
+        buffered, length = [], 0
+        try:
+            for part in parts:
+                buffered.append(part)
+                length += len(part)
+                if length >= size:
+                    yield ''.join(buffered)
+                    buffered, length = [], 0
+            if buffered:
+                yield ''.join(buffered)
+        finally:
+            parts.close()
+
+    return Response(chunks(stream_template(template_name, **context),
+                           current_app.config['STREAM_CHUNK_SIZE']),
+                    mimetype='text/html')
+
+
+def venue_cache_tags(venue_id):
+    """Cache tags of every page that renders the given venue."""
+    artist_ids = db.session.scalars(
+        select(Show.artist_id).where(Show.venue_id == venue_id).distinct())
+    return ['venues', 'shows', f'venue:{venue_id}',
+            *(f'artist:{artist_id}' for artist_id in artist_ids)]
+
+
+def artist_cache_tags(artist_id):
+    """Cache tags of every page that renders the given artist."""
+    venue_ids = db.session.scalars(
+        select(Show.venue_id).where(Show.artist_id == artist_id).distinct())
+    return ['artists', 'shows', f'artist:{artist_id}',
+            *(f'venue:{venue_id}' for venue_id in venue_ids)]
 
 
 # ----------------------------------------------------------------------------#
@@ -34,7 +210,7 @@ migrate = Migrate(app, db)
 # ----------------------------------------------------------------------------#
 
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('pages/home.html')
 
@@ -42,16 +218,22 @@ def index():
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@bp.route('/venues')
+@cached('venues')
 def venues():
-    areas = Area.query.all()
-    return render_template('pages/venues.html', areas=areas)
+    # Load every area's venues in a single extra SELECT instead of one per
+    # area, and only fetch the columns the listing renders.
+    areas = Area.query.options(
+        selectinload(Area.venues).load_only(
+            Venue.id, Venue.name, Venue.upcoming_show_count)
+    ).order_by(Area.state, Area.city).all()
+    return stream_page('pages/venues.html', areas=areas)
 
 
-@app.route('/venues/search', methods=['POST'])
+@bp.route('/venues/search', methods=['POST'])
 def search_venues():
     search_term = request.form.get('search_term', '')
-    data = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()
+    data = get_search().search_venues(search_term)
     response = {
         "count": len(data),
         "data": data
@@ -59,19 +241,22 @@ def search_venues():
     return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
 
-@app.route('/venues/<int:venue_id>')
+@bp.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: Venue.last_modified(venue_id))
+@cached('venue:{venue_id}')
 def show_venue(venue_id):
-    venue = Venue.query.get(venue_id)
-    return render_template('pages/show_venue.html', venue=venue)
+    venue = Venue.query.get_or_404(venue_id)
+    return render_template('pages/show_venue.html', venue=venue,
+                           **show_schedule(venue))
 
 
-@app.route('/venues/create', methods=['GET'])
+@bp.route('/venues/create', methods=['GET'])
 def create_venue_form():
     form = VenueForm()
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/create', methods=['POST'])
+@bp.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     form = VenueForm()
 
@@ -90,34 +275,35 @@ def create_venue_submission():
                 seeking_description=form.seeking_description.data,
                 area_id=area.id
             )
+            venue.genres = get_or_create_genres(form.genres.data, db)
             db.session.add(venue)
 
-            for genre_name in form.genres.data:
-                genre = get_or_create_genre(genre_name, db)
-                venue.genres.append(genre)
-
             db.session.commit()
+            get_page_cache().invalidate('venues')
+            warm_later(url_for('.venues'))
             flash(f'Venue {venue.name} was successfully listed!')
-            return redirect(url_for('show_venue', venue_id=venue.id))
+            return redirect(url_for('.show_venue', venue_id=venue.id))
 
         except (Exception, SQLAlchemyError):
             db.session.rollback() 
             flash(
                 f'An error occurred. Venue {form.name.data} could not be listed.')
-            return redirect(url_for('create_venue_form'))
+            return redirect(url_for('.create_venue_form'))
     else:
         for field, errors in form.errors.items():
             for error in errors:
                 flash(f'Error in {field}: {error}')
-        return redirect(url_for('create_venue_form'))
+        return redirect(url_for('.create_venue_form'))
 
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
     try:
         venue = Venue.query.get(venue_id)
         db.session.delete(venue)
+        cache_tags = venue_cache_tags(venue.id)
         db.session.commit()
+        get_page_cache().invalidate(*cache_tags)
         return jsonify({'success': True}), 200
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -127,7 +313,7 @@ def delete_venue(venue_id):
         db.session.close()
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
     venue = Venue.query.get(venue_id)
     form = VenueForm(obj=venue)
@@ -137,7 +323,7 @@ def edit_venue(venue_id):
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
     form = VenueForm(request.form)
     venue = Venue.query.get(venue_id)
@@ -153,40 +339,47 @@ def edit_venue_submission(venue_id):
             venue.area_id = get_or_create_area(
                 city=form.city.data, state=form.state.data, db=db).id
 
-            venue.genres.clear()
-            for genre_name in form.genres.data:
-                genre = get_or_create_genre(genre_name=genre_name, db=db)
-                if genre not in venue.genres:
-                    venue.genres.append(genre)
+            venue.genres = get_or_create_genres(
+                genre_names=form.genres.data, db=db)
+            # A genre-only edit leaves the venue row itself unchanged, so
+            # onupdate alone would not move the conditional() validators.
+            venue.updated_at = datetime.now()
 
+            Artist.touch(select(Show.artist_id).where(Show.venue_id == venue_id))
+            cache_tags = venue_cache_tags(venue_id)
             db.session.commit()
-            return render_template('pages/show_venue.html', venue=venue)
+            get_page_cache().invalidate(*cache_tags)
+            return render_template('pages/show_venue.html', venue=venue,
+                                   **show_schedule(venue))
 
         except (SQLAlchemyError, Exception):
             db.session.rollback()
             flash(
                 f'An error occurred. Venue {form.name.data} could not be listed.')
-            return redirect(url_for('edit_venue', venue_id=venue_id))
+            return redirect(url_for('.edit_venue', venue_id=venue_id))
     else:
         for field, errors in form.errors.items():
                 for error in errors:
                     flash(f'Error in {field}: {error}')
-        return redirect(url_for('edit_venue', venue_id=venue_id))
+        return redirect(url_for('.edit_venue', venue_id=venue_id))
 
 #  Artists
 #  ----------------------------------------------------------------
 
 
-@app.route('/artists')
+@bp.route('/artists')
+@cached('artists')
 def artists():
-    data = Artist.query.all()
-    return render_template('pages/artists.html', artists=data)
+    data = Artist.query.options(
+        load_only(Artist.id, Artist.name, Artist.upcoming_show_count)
+    ).all()
+    return stream_page('pages/artists.html', artists=data)
 
 
-@app.route('/artists/search', methods=['POST'])
+@bp.route('/artists/search', methods=['POST'])
 def search_artists():
     search_term = request.form.get('search_term', '')
-    data = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()
+    data = get_search().search_artists(search_term)
     response = {
         "count": len(data),
         "data": data
@@ -194,13 +387,16 @@ def search_artists():
     return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 
-@app.route('/artists/<int:artist_id>')
+@bp.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: Artist.last_modified(artist_id))
+@cached('artist:{artist_id}')
 def show_artist(artist_id):
-    artist = Artist.query.get(artist_id)
-    return render_template('pages/show_artist.html', artist=artist)
+    artist = Artist.query.get_or_404(artist_id)
+    return render_template('pages/show_artist.html', artist=artist,
+                           **show_schedule(artist))
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
     form = ArtistForm()
     artist = Artist.query.get(artist_id)
@@ -212,7 +408,7 @@ def edit_artist(artist_id):
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
     form = ArtistForm(request.form)
     artist = Artist.query.get(artist_id)
@@ -228,33 +424,37 @@ def edit_artist_submission(artist_id):
             artist.area_id = get_or_create_area(
                 city=form.city.data, state=form.state.data, db=db).id
 
-            artist.genres.clear()
-            for genre_name in form.genres.data:
-                genre = get_or_create_genre(genre_name=genre_name, db=db)
-                if genre not in artist.genres:
-                    artist.genres.append(genre)
+            artist.genres = get_or_create_genres(
+                genre_names=form.genres.data, db=db)
+            # A genre-only edit leaves the artist row itself unchanged, so
+            # onupdate alone would not move the conditional() validators.
+            artist.updated_at = datetime.now()
 
+            Venue.touch(select(Show.venue_id).where(Show.artist_id == artist_id))
+            cache_tags = artist_cache_tags(artist_id)
             db.session.commit()
-            return render_template('pages/show_artist.html', artist=artist)
+            get_page_cache().invalidate(*cache_tags)
+            return render_template('pages/show_artist.html', artist=artist,
+                                   **show_schedule(artist))
         except (SQLAlchemyError, Exception):
                 db.session.rollback()
                 flash(
                     f'An error occurred. Artist {form.name.data} could not be listed.')
-                return redirect(url_for('edit_artist', artist_id=artist_id))
+                return redirect(url_for('.edit_artist', artist_id=artist_id))
     else:
         for field, errors in form.errors.items():
                 for error in errors:
                     flash(f'Error in {field}: {error}')
-        return redirect(url_for('edit_artist', artist_id=artist_id))
+        return redirect(url_for('.edit_artist', artist_id=artist_id))
   
 
-@app.route('/artists/create', methods=['GET'])
+@bp.route('/artists/create', methods=['GET'])
 def create_artist_form():
     form = ArtistForm()
     return render_template('forms/new_artist.html', form=form)
 
 
-@app.route('/artists/create', methods=['POST'])
+@bp.route('/artists/create', methods=['POST'])
 def create_artist_submission():
     form = ArtistForm()
 
@@ -273,81 +473,156 @@ def create_artist_submission():
                 area_id=area.id,
                 website=form.website_link.data
             )
+            artist.genres = get_or_create_genres(
+                genre_names=form.genres.data, db=db)
             db.session.add(artist)
 
-            for genre_name in form.genres.data:
-                genre = get_or_create_genre(genre_name=genre_name, db=db)
-                artist.genres.append(genre)
-
             db.session.commit()
+            get_page_cache().invalidate('artists')
+            warm_later(url_for('.artists'))
             flash(f'Artist {artist.name} was successfully listed!')
-            return redirect(url_for('show_artist', artist_id=artist.id))
+            return redirect(url_for('.show_artist', artist_id=artist.id))
 
         except (SQLAlchemyError, Exception):
             db.session.rollback()
             flash(
                 f'An error occurred. Artist {form.name.data} could not be listed.')
-            return redirect(url_for('create_artist_form'))
+            return redirect(url_for('.create_artist_form'))
     else:
         for field, errors in form.errors.items():
             for error in errors:
                 flash(f'Error in {field}: {error}')
-        return redirect(url_for('create_artist_form'))
+        return redirect(url_for('.create_artist_form'))
 
 
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@bp.route('/shows')
+@cached('shows')
 def shows():
-    data = Show.query.all()
-    return render_template('pages/shows.html', shows=data)
+    after = decode_cursor(request.args.get('after'))
+    before = decode_cursor(request.args.get('before'))
+    data, has_more = Show.keyset_page(
+        current_app.config['SHOWS_PER_PAGE'], after=after, before=before)
+
+    # Paging backwards always leaves newer shows behind us; paging forwards
+    # only has a previous page once we moved past the first one.
+    if before is not None:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, after is not None
+
+    next_cursor = prev_cursor = None
+    if data and has_next:
+        next_cursor = encode_cursor(data[-1].start_time, data[-1].id)
+    if data and has_prev:
+        prev_cursor = encode_cursor(data[0].start_time, data[0].id)
+    return stream_page('pages/shows.html', shows=data,
+                       next_cursor=next_cursor, prev_cursor=prev_cursor)
 
 
-@app.route('/shows/create')
+@bp.route('/shows/calendar')
+def show_calendar():
+    try:
+        filters = parse_calendar_args(request.args)
+        year, month = parse_month(request.args.get('month') or
+                                  date.today().strftime('%Y-%m'))
+    except ValueError:
+        flash('Dates must look like 2026-10-18 and months like 2026-10.')
+        return redirect(url_for('.show_calendar'))
+
+    # Without a date range, list the next seven days.
+    if filters['start'] is None and filters['end'] is None:
+        filters['start'] = datetime.combine(date.today(), datetime.min.time())
+        filters['end'] = filters['start'] + timedelta(days=7)
+    area = {key: filters[key] for key in ('city', 'state', 'genre')}
+    first = date(year, month, 1)
+
+    def day_url(day):
+        bounds = {'from': day.isoformat(), 'to': day.isoformat()}
+        return url_for('.show_calendar', month=first.strftime('%Y-%m'),
+                       **area, **bounds)
+
+    return render_template(
+        'pages/calendar.html',
+        weeks=calendar.Calendar().monthdatescalendar(year, month),
+        month=first,
+        prev_month=(first - timedelta(days=1)).strftime('%Y-%m'),
+        next_month=(first + timedelta(days=31)).strftime('%Y-%m'),
+        totals=month_calendar(year, month, **area),
+        shows=shows_between(show_filters(**filters),
+                            current_app.config['CALENDAR_MAX_SHOWS']),
+        range_start=filters['start'],
+        range_end=filters['end'] - timedelta(days=1) if filters['end']
+        else None,
+        genres=[genre.value for genre in GenreEnum],
+        filters=area,
+        day_url=day_url)
+
+
+@bp.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
 
-@app.route('/shows/create', methods=['POST'])
+@bp.route('/shows/create', methods=['POST'])
 def create_show_submission():
     form = ShowForm()
 
     if form.validate_on_submit():
         try:
             show = Show(
-                artist_id=int(form.artist_id.data),
-                venue_id=int(form.venue_id.data),
-                start_time=form.start_time.data
+                artist_id=form.artist_id.data,
+                venue_id=form.venue_id.data,
+                start_time=form.start_time.data,
+                end_time=form.end_time
             )
             db.session.add(show)
+            db.session.flush()
+            Venue.touch([show.venue_id])
+            Artist.touch([show.artist_id])
+            Venue.refresh_show_counts([show.venue_id])
+            Artist.refresh_show_counts([show.artist_id])
             db.session.commit()
+            get_page_cache().invalidate(
+                'shows', 'venues', 'artists', f'venue:{show.venue_id}',
+                f'artist:{show.artist_id}')
+            warm_later(url_for('.shows'), url_for('.venues'),
+                       url_for('.artists'))
             flash(f'Success! The show must go on!')
-            return redirect(url_for('shows'))
+            return redirect(url_for('.shows'))
         except(Exception, SQLAlchemyError):
             db.session.rollback()
             flash(
                 f'An error occurred. Unfortunately the show could not go on.')
-            return redirect(url_for('create_shows'))
+            return redirect(url_for('.create_shows'))
     else:
         for field, errors in form.errors.items():
             for error in errors:
                 flash(f'Error in {field}: {error}')
-        return redirect(url_for('create_shows'))
+        return redirect(url_for('.create_shows'))
+
+
+@bp.route('/shows/export.<fmt>')
+def export_shows(fmt):
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    to_chunks, mimetype = EXPORT_FORMATS[fmt]
+    batches = show_catalogue_batches(current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(
+        stream_with_context(to_chunks(batches)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=shows.{fmt}'}
+    )
 
 
-@app.route('/shows/search', methods=['POST'])
+@bp.route('/shows/search', methods=['POST'])
 def search_shows():
     search_term = request.form.get('search_term', '')
-
-    data = Show.query.join(Artist).join(Venue).filter(
-        or_(
-            Artist.name.ilike(f'%{search_term}%'),
-            Venue.name.ilike(f'%{search_term}%')
-        )
-    ).all()
+    data = get_search().search_shows(search_term)
     response = {
         "count": len(data),
         "data": data
@@ -355,33 +630,74 @@ def search_shows():
     return render_template('pages/search_shows.html', results=response, search_term=search_term)
 
 
-@app.errorhandler(404)
+#  Suggestions
+#  ----------------------------------------------------------------
+
+@bp.route('/api/suggest')
+def suggestions():
+    prefix = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', current_app.config['SUGGEST_LIMIT'],
+                                 type=int), current_app.config['SUGGEST_LIMIT'])
+    kinds = tuple(request.args.getlist('kind')) or tuple(SUGGEST_MODELS)
+    if not prefix or limit < 1 or not set(kinds) <= set(SUGGEST_MODELS):
+        return jsonify(data=[], source='none')
+    data, source = suggest(prefix, limit, kinds)
+    return jsonify(data=data, source=source)
+
+
+#  Static assets
+#  ----------------------------------------------------------------
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    # Fingerprinted by `flask build-assets`, so they never change.
+    return send_asset(filename)
+
+
+#  Thumbnails
+#  ----------------------------------------------------------------
+
+@bp.route('/thumbnails/<name>')
+def thumbnail(name):
+    # Names are content hashes, so a name never changes its contents.
+    if not THUMBNAIL_NAME.match(name):
+        abort(404)
+    response = send_from_directory(
+        current_app.config['IMAGE_CACHE_DIR'], os.path.join(name[:2], name),
+        max_age=THUMBNAIL_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@bp.route('/cache/stats')
+def cache_stats():
+    return jsonify(get_page_cache().stats())
+
+
+@bp.route('/metrics')
+def metrics():
+    return Response(render_metrics(),
+                    mimetype='text/plain; version=0.0.4')
+
+
+@bp.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
 
 # Default port:
 if __name__ == '__main__':
+    app = create_app()
     app.debug = True
     app.run(host="0.0.0.0", port=5000)
 
@@ -389,5 +705,5 @@ if __name__ == '__main__':
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
@@ -0,0 +1,252 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import Flask, current_app, request, send_from_directory, url_for
+
+# Files the layout loads together, in load order, keyed by the name
+# templates ask for. Paths are relative to the static folder.
+BUNDLES = {
+    'css/app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # Loaded synchronously in <head>.
+    'js/head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # Deferred, so it runs after jQuery in the order the scripts used to.
+    'js/app.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+}
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.map', '.json', '.txt')
+# Precompressed variants are only written when they save at least this much.
+MIN_SAVING = 0.1
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+# String literals, kept verbatim, and comments, dropped, by minify_css.
+CSS_STRING_OR_COMMENT = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+
+
+def _collapse_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    # Not around ':', which separates "a :hover" from "a:hover".
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}')
+
+
+def minify_css(text):
+    """Drop comments and collapse whitespace outside string literals."""
+    parts, position = [], 0
+    for match in CSS_STRING_OR_COMMENT.finditer(text):
+        parts.append(_collapse_css(text[position:match.start()]))
+        parts.append(match.group(1) or '')
+        position = match.end()
+    parts.append(_collapse_css(text[position:]))
+    return ''.join(parts).strip()
+
+
+def minify_js(text):
+    """Drop indentation, blank lines and whole-line ``//`` comments.
+
+    Line breaks are kept so automatic semicolon insertion, regex literals
+    and strings behave exactly as before.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not line.startswith('//'))
+
+
+def _rebase_css_urls(text, source, target, manifest, static_url):
+    """Point the relative ``url()``s of ``source`` at fingerprinted copies.
+
+    ``target`` is where the CSS is written inside the build folder, which
+    is served as is under ``/assets/``, so links to other built files stay
+    relative. Files missing from ``manifest`` are linked under
+    ``static_url`` instead. Paths are relative to the static folder.
+    """
+    def rebase(match):
+        quote, url = match.groups()
+        if re.match(r'^([a-z]+:|/|#)', url):
+            return match.group(0)
+        # Keep "?#iefix" and "#id" suffixes, as in font-face rules.
+        path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        resolved = posixpath.normpath(
+            posixpath.join(posixpath.dirname(source), path))
+        if resolved in manifest:
+            rebased = posixpath.relpath(manifest[resolved],
+                                        posixpath.dirname(target))
+        else:
+            rebased = f'{static_url}/{resolved}'
+        return f'url({quote}{rebased}{suffix}{quote})'
+    return CSS_URL.sub(rebase, text)
+
+
+def _minify(path, text):
+    if '.min.' in posixpath.basename(path):
+        return text
+    if path.endswith('.css'):
+        return minify_css(text)
+    if path.endswith('.js'):
+        return minify_js(text)
+    return text
+
+
+def _fingerprint(name, data):
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _write(directory, name, data):
+    """Write ``data`` plus the precompressed variants worth keeping."""
+    path = os.path.join(directory, *name.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output:
+        output.write(data)
+    if not name.endswith(COMPRESSIBLE):
+        return
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            with open(path + suffix, 'wb') as output:
+                output.write(compressed)
+
+
+def build_assets(static_folder, static_url='/static'):
+    """Bundle, minify and fingerprint the static files into ``build/``.
+
+    Every static file gets a content-hashed copy, and each bundle one
+    combined file. Stylesheets are copied last, with their ``url()``s
+    pointing at the hashed copies of fonts and images. The manifest maps
+    source and bundle names to the hashed names and is written last, so a
+    running app never sees a manifest pointing at missing files. Earlier
+    builds are left in place for pages still referencing them during a
+    deploy. Returns the manifest.
+    """
+    build_dir = os.path.join(static_folder, BUILD_DIR)
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [name for name in dirs if name != BUILD_DIR]
+        sources += [os.path.relpath(os.path.join(root, filename),
+                                    static_folder).replace(os.sep, '/')
+                    for filename in files]
+
+    manifest = {}
+    for source in sorted(sources, key=lambda name: name.endswith('.css')):
+        with open(os.path.join(static_folder, *source.split('/')),
+                  'rb') as handle:
+            data = handle.read()
+        if source.endswith('.css'):
+            data = _rebase_css_urls(data.decode('utf-8'), source, source,
+                                    manifest, static_url).encode('utf-8')
+        manifest[source] = _fingerprint(source, data)
+        _write(build_dir, manifest[source], data)
+
+    for bundle, bundled in BUNDLES.items():
+        parts = []
+        for source in bundled:
+            with open(os.path.join(static_folder, *source.split('/')),
+                      encoding='utf-8') as handle:
+                text = _minify(source, handle.read())
+            if bundle.endswith('.css'):
+                text = _rebase_css_urls(text, source, bundle, manifest,
+                                        static_url)
+            parts.append(text)
+        # A trailing semicolon-less script must not run into the next one.
+        separator = '\n' if bundle.endswith('.css') else '\n;\n'
+        data = separator.join(parts).encode('utf-8')
+        manifest[bundle] = _fingerprint(bundle, data)
+        _write(build_dir, manifest[bundle], data)
+
+    partial = os.path.join(build_dir, f'{MANIFEST}.tmp')
+    with open(partial, 'w', encoding='utf-8') as output:
+        json.dump(manifest, output, indent=1, sort_keys=True)
+    os.replace(partial, os.path.join(build_dir, MANIFEST))
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST),
+                  encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(name):
+    """URL of a static file, fingerprinted once ``flask build-assets`` ran."""
+    hashed = current_app.extensions['assets'].get(name)
+    if hashed is None:
+        return url_for('static', filename=name)
+    return url_for('main.asset', filename=hashed)
+
+
+def asset_urls(name):
+    """URLs to load ``name``: the built bundle, or its sources unbuilt."""
+    if name in current_app.extensions['assets'] or name not in BUNDLES:
+        return [asset_url(name)]
+    return [asset_url(source) for source in BUNDLES[name]]
+
+
+def send_asset(filename):
+    """Serve a fingerprinted file, precompressed if the client accepts it."""
+    directory = os.path.join(current_app.static_folder, BUILD_DIR)
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if (request.accept_encodings[encoding]
+                and os.path.isfile(os.path.join(directory,
+                                                filename + suffix))):
+            response = send_from_directory(
+                directory, filename + suffix, max_age=ASSET_MAX_AGE,
+                mimetype=mimetypes.guess_type(filename)[0])
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename,
+                                       max_age=ASSET_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app: Flask) -> None:
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.add_template_global(asset_url)
+    app.add_template_global(asset_urls)
+
+
+def register_asset_commands(app: Flask) -> None:
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Bundle, minify, fingerprint and precompress the static files."""
+        manifest = build_assets(current_app.static_folder,
+                                current_app.static_url_path)
+        for bundle in BUNDLES:
+            click.echo(f'{bundle} -> {manifest[bundle]}')
+        click.echo(f'Wrote {len(manifest)} assets to '
+                   f'{os.path.join(current_app.static_folder, BUILD_DIR)}')
@@ -0,0 +1,112 @@
+"""Command line entry point: ``python -m benchmarks generate|run``.
+
+The database is taken from ``DATABASE_URL`` like the app itself, e.g.::
+
+    export DATABASE_URL=postgresql://localhost/fyyur_bench
+    python -m benchmarks generate --scale 100k
+    python -m benchmarks run --baseline benchmarks/baseline.json
+
+To see what a change does, save a report before and after it and put them
+side by side::
+
+    python -m benchmarks run --output before.json
+    python -m benchmarks run --output after.json
+    python -m benchmarks compare before.json after.json
+
+``benchmarks/baseline.json`` was recorded at the 10k scale on SQLite with
+the in-process test client. ``--baseline`` fails a run on more queries per
+request or on server errors, which do not depend on the machine. Latency,
+response size and memory changes are only reported, unless ``--strict`` is
+given against a baseline recorded on the same machine with ``--output``.
+"""
+import argparse
+import sys
+
+from flask_migrate import stamp
+
+from app import create_app
+from benchmarks.datagen import SCALES, generate
+from benchmarks.runner import (compare, format_comparison, load_report, run,
+                               save_report)
+from cache import MemoryCache
+from models import db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser(
+        'generate', help='Create the schema in an empty database and fill '
+                         'it.')
+    generate_parser.add_argument('--scale', choices=SCALES, default='10k')
+    generate_parser.add_argument('--seed', type=int, default=0)
+
+    run_parser = commands.add_parser(
+        'run', help='Benchmark every read route.')
+    run_parser.add_argument('--requests', type=int, default=50,
+                            help='Requests per route.')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--url',
+                            help='Benchmark a running server instead of '
+                                 'the in-process test client.')
+    run_parser.add_argument('--server-pid', type=int,
+                            help='Read the peak RSS of this server process.')
+    run_parser.add_argument('--page-cache', action='store_true',
+                            help='Keep the page cache enabled.')
+    run_parser.add_argument('--output', help='Write the report to this file.')
+    run_parser.add_argument('--baseline',
+                            help='Fail on regressions against this report.')
+    run_parser.add_argument('--strict', action='store_true',
+                            help='Also fail on latency, size and memory '
+                                 'regressions.')
+    run_parser.add_argument('--tolerance', type=float, default=1.5)
+    run_parser.add_argument('--accept-encoding', default='br, gzip',
+                            help='Accept-Encoding header to send; use '
+                                 '"identity" for uncompressed responses.')
+
+    compare_parser = commands.add_parser(
+        'compare', help='Show two saved reports side by side.')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        for line in format_comparison(load_report(args.before),
+                                      load_report(args.after)):
+            print(line)
+        return 0
+
+    app = create_app()
+    if args.command == 'generate':
+        with app.app_context():
+            # The oldest migrations predate the current models, so build
+            # the schema from the models and mark it as fully migrated.
+            db.create_all()
+            stamp()
+            generate(SCALES[args.scale], seed=args.seed)
+        return 0
+
+    if not args.page_cache:
+        # Measure the views themselves rather than cache hits.
+        app.extensions['page_cache'].backend = MemoryCache(max_entries=0)
+    report = run(app, requests_per_route=args.requests, seed=args.seed,
+                 base_url=args.url, server_pid=args.server_pid,
+                 accept_encoding=args.accept_encoding)
+    if args.output:
+        save_report(report, args.output)
+    if args.baseline:
+        regressions, warnings = compare(report, load_report(args.baseline),
+                                        tolerance=args.tolerance,
+                                        strict=args.strict)
+        for warning in warnings:
+            print(f'WARNING {warning}', file=sys.stderr)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Deterministic synthetic data for benchmarks.
+
+The same seed, scale and anchor date always produce the same rows. Show
+start times are spread two years either side of the anchor, so both the
+upcoming and the past branches of the detail pages have data.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from forms import GenreEnum, StateEnum
+from models import (Area, Artist, Genre, Show, Venue, artist_genres, db,
+                    venue_genres)
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+BATCH_SIZE = 5_000
+WORDS = ('Red', 'Blue', 'Velvet', 'Electric', 'Golden', 'Midnight', 'Rusty',
+         'Silver', 'Lonely', 'Neon', 'Wild', 'Broken', 'Crystal', 'Howling')
+NOUNS = ('Room', 'Hall', 'Owls', 'Tavern', 'Garage', 'Lounge', 'Foxes',
+         'Parlor', 'Arcade', 'Rebels', 'Cellar', 'Lanterns', 'Barn', 'Ghosts')
+
+
+def _name(rng, index):
+    return f'{rng.choice(WORDS)} {rng.choice(NOUNS)} {index}'
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def _reset_sequences(tables):
+    # Rows were inserted with explicit ids, so PostgreSQL's serial sequences
+    # have to be moved past them before the app inserts anything.
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in tables:
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT MAX(id) FROM {table}))"))
+
+
+def generate(shows, seed=0, anchor=None, echo=print):
+    """Fill an empty database with ``shows`` shows and matching entities.
+
+    Venues, artists and areas scale with the show count (20, 10 and 200
+    shows per row respectively).
+    """
+    rng = random.Random(seed)
+    anchor = anchor or datetime.combine(datetime.now().date(),
+                                        datetime.min.time())
+    started = time.perf_counter()
+
+    genres = [{'id': index, 'name': genre.value}
+              for index, genre in enumerate(GenreEnum, start=1)]
+    _insert(Genre, genres)
+
+    states = StateEnum.values()
+    areas = [{'id': index, 'city': f'City {index}',
+              'state': rng.choice(states)}
+             for index in range(1, max(shows // 200, 1) + 1)]
+    _insert(Area, areas)
+
+    def profile(index):
+        return {
+            'id': index,
+            'name': _name(rng, index),
+            'area_id': rng.randint(1, len(areas)),
+            'phone': f'{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04d}',
+            'image_link': f'https://example.com/img/{index}.jpg',
+            'facebook_link': f'https://facebook.com/{index}',
+            'website': f'https://example.com/{index}',
+            'seeking_description': 'Looking for new collaborations.',
+        }
+
+    venues = [dict(profile(index), address=f'{index} Main Street',
+                   seeking_talent=rng.random() < 0.5)
+              for index in range(1, max(shows // 20, 1) + 1)]
+    _insert(Venue, venues)
+    artists = [dict(profile(index), seeking_venue=rng.random() < 0.5)
+               for index in range(1, max(shows // 10, 1) + 1)]
+    _insert(Artist, artists)
+
+    _insert(venue_genres, [
+        {'venue_id': venue['id'], 'genre_id': genre_id}
+        for venue in venues
+        for genre_id in rng.sample(range(1, len(genres) + 1), 2)])
+    _insert(artist_genres, [
+        {'artist_id': artist['id'], 'genre_id': genre_id}
+        for artist in artists
+        for genre_id in rng.sample(range(1, len(genres) + 1), 2)])
+
+    span = int(timedelta(days=730).total_seconds())
+    for start in range(0, shows, BATCH_SIZE):
+        _insert(Show, [{
+            'venue_id': rng.randint(1, len(venues)),
+            'artist_id': rng.randint(1, len(artists)),
+            'start_time': anchor + timedelta(
+                seconds=rng.randint(-span, span) // 1800 * 1800),
+        } for _ in range(start, min(start + BATCH_SIZE, shows))])
+    Venue.refresh_show_counts(now=anchor)
+    Artist.refresh_show_counts(now=anchor)
+    _reset_sequences(('genre', 'area', 'venue', 'artist'))
+    db.session.commit()
+
+    echo(f'Generated {len(areas)} areas, {len(venues)} venues, '
+         f'{len(artists)} artists and {shows} shows in '
+         f'{time.perf_counter() - started:.1f}s')
@@ -0,0 +1,287 @@
+"""Drive every read route of the app and report latency and query counts.
+
+Requests go through the Flask test client by default, or over HTTP to a
+running server when a base URL is given. Mutating routes (create, edit,
+delete) are skipped so repeated runs see the same data. Besides total
+latency, each route reports the time to the first body byte and the body
+size on the wire for the ``Accept-Encoding`` the run sends.
+"""
+import json
+import random
+import re
+import resource
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from benchmarks.datagen import NOUNS, WORDS
+from models import Artist, Venue, db
+
+SEARCH_TERMS = ('Red', 'hall', 'Owls 1', 'neon', 'x')
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+ROUTE_ARGUMENT = re.compile(r'<(?:[^:>]+:)?(\w+)>')
+# Routes that send files from disk rather than render anything.
+FILE_ENDPOINTS = ('static', 'main.asset', 'main.thumbnail')
+
+
+def _suggest_arguments(rng):
+    # Prefixes of the words datagen builds names from, so most match.
+    word = rng.choice(WORDS + NOUNS)
+    return {'q': word[:rng.randint(1, 4)].lower(),
+            'kind': rng.choice(('venue', 'artist'))}
+
+
+def _calendar_arguments(rng):
+    # datagen spreads shows two years either side of today.
+    day = date.today() + timedelta(days=rng.randint(-365, 365))
+    if rng.random() < 0.5:
+        return {'month': day.strftime('%Y-%m')}
+    return {'from': day.isoformat(),
+            'to': (day + timedelta(days=6)).isoformat()}
+
+
+# Query strings for routes that only do real work when given arguments.
+QUERY_ARGUMENTS = {
+    'main.suggestions': _suggest_arguments,
+    'api.calendar_totals': _calendar_arguments,
+}
+
+
+def plan_requests(app, rng):
+    """Yield ``(label, method, path_factory, form)`` for every read route."""
+    with app.app_context():
+        venue_count = db.session.query(func.max(Venue.id)).scalar() or 1
+        artist_count = db.session.query(func.max(Artist.id)).scalar() or 1
+    arguments = {
+        'venue_id': lambda: rng.randint(1, venue_count),
+        'artist_id': lambda: rng.randint(1, artist_count),
+        'fmt': lambda: 'jsonl',
+        'kind': lambda: rng.choice(('venues', 'artists', 'shows')),
+        'resource_id': lambda: rng.randint(1, venue_count),
+    }
+
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if rule.endpoint in FILE_ENDPOINTS:
+            continue
+        if 'GET' in rule.methods and not rule.endpoint.endswith(
+                ('edit_venue', 'edit_artist')):
+            method, form = 'GET', None
+        elif rule.endpoint.startswith('main.search_'):
+            method, form = 'POST', True
+        else:
+            continue
+
+        def path(rule=rule, query=QUERY_ARGUMENTS.get(rule.endpoint)):
+            url = ROUTE_ARGUMENT.sub(
+                lambda m: str(arguments[m.group(1)]()), rule.rule)
+            if query is not None:
+                url += '?' + urllib.parse.urlencode(query(rng))
+            return url
+        yield rule.rule, method, path, form
+
+
+class _TestClientTransport:
+    """Returns ``(status, Server-Timing headers, first byte time, size)``."""
+
+    def __init__(self, app, accept_encoding):
+        self.client = app.test_client()
+        self.headers = {'Accept-Encoding': accept_encoding}
+
+    def __call__(self, method, path, form):
+        response = self.client.open(path, method=method, data=form,
+                                    headers=self.headers, buffered=False)
+        first_byte, size = None, 0
+        try:
+            for chunk in response.response:
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+                size += len(chunk)
+        finally:
+            response.close()
+        return (response.status_code,
+                response.headers.getlist('Server-Timing'),
+                first_byte or time.perf_counter(), size)
+
+
+class _HttpTransport:
+
+    def __init__(self, base_url, accept_encoding):
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Accept-Encoding': accept_encoding}
+
+    def __call__(self, method, path, form):
+        data = urllib.parse.urlencode(form).encode() if form else None
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers=self.headers, method=method)
+        try:
+            # urllib does not decode the body, so its length is the number
+            # of bytes that crossed the wire.
+            with urllib.request.urlopen(request) as response:
+                first_byte = time.perf_counter()
+                size = len(response.read())
+                return (response.status,
+                        response.headers.get_all('Server-Timing') or [],
+                        first_byte, size)
+        except urllib.error.HTTPError as e:
+            first_byte = time.perf_counter()
+            return (e.code, e.headers.get_all('Server-Timing') or [],
+                    first_byte, len(e.read()))
+
+
+def _queries(timings):
+    for header in timings:
+        match = SERVER_TIMING_QUERIES.search(header)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _percentiles(samples):
+    if len(samples) < 2:
+        return samples[0], samples[0], samples[0]
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+
+def _server_peak_rss_kb(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1])
+    return None
+
+
+def run(app, requests_per_route=50, seed=0, base_url=None, server_pid=None,
+        accept_encoding='br, gzip', echo=print):
+    """Benchmark every read route and return a JSON-serialisable report."""
+    rng = random.Random(seed)
+    transport = (_HttpTransport(base_url, accept_encoding) if base_url
+                 else _TestClientTransport(app, accept_encoding))
+    routes = {}
+
+    for label, method, path, form in plan_requests(app, rng):
+        # One untimed request fills template and statement caches.
+        transport(method, path(), {'search_term': 'a'} if form else None)
+        latencies, first_bytes, sizes, queries, errors = [], [], [], [], 0
+        for _ in range(requests_per_route):
+            data = {'search_term': rng.choice(SEARCH_TERMS)} if form else None
+            started = time.perf_counter()
+            status, timings, first_byte, size = transport(method, path(),
+                                                          data)
+            latencies.append((time.perf_counter() - started) * 1000)
+            first_bytes.append((first_byte - started) * 1000)
+            sizes.append(size)
+            if status >= 500:
+                errors += 1
+            count = _queries(timings)
+            if count is not None:
+                queries.append(count)
+
+        p50, p95, p99 = _percentiles(latencies)
+        ttfb_p50, ttfb_p95, _ = _percentiles(first_bytes)
+        size = statistics.median(sizes)
+        most_queries = max(queries) if queries else None
+        routes[f'{method} {label}'] = {
+            'p50_ms': round(p50, 2),
+            'p95_ms': round(p95, 2),
+            'p99_ms': round(p99, 2),
+            'ttfb_p50_ms': round(ttfb_p50, 2),
+            'ttfb_p95_ms': round(ttfb_p95, 2),
+            'bytes': int(size),
+            'queries_per_request': most_queries,
+            'server_errors': errors,
+        }
+        echo(f'{method:4} {label:32} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  '
+             f'p99 {p99:8.2f} ms  ttfb {ttfb_p50:8.2f} ms  '
+             f'{size / 1024:8.1f} KiB  queries {most_queries}')
+
+    if base_url:
+        peak_rss_kb = _server_peak_rss_kb(server_pid) if server_pid else None
+    else:
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    echo(f'peak RSS: {peak_rss_kb} KiB')
+    return {'routes': routes, 'peak_rss_kb': peak_rss_kb,
+            'accept_encoding': accept_encoding}
+
+
+def compare(report, baseline, tolerance=1.5, slack_ms=2.0, strict=False):
+    """Return ``(regressions, warnings)`` of ``report`` against ``baseline``.
+
+    Query counts must not grow and server errors must not appear; these
+    do not depend on the machine, so they are always regressions.
+    p50, p95 and time-to-first-byte p50 latency may grow by ``tolerance``
+    times plus ``slack_ms`` (p99 is reported but too noisy at a few dozen
+    requests per route), and response sizes and peak RSS by ``tolerance``
+    times. Sizes are only compared when both runs sent the same
+    ``Accept-Encoding``. Latency, size and RSS changes are warnings unless
+    ``strict``, which only makes sense against a baseline recorded on the
+    same machine.
+    """
+    same_encoding = (report.get('accept_encoding')
+                     == baseline.get('accept_encoding'))
+    regressions, warnings = [], []
+    measured = regressions if strict else warnings
+    for route, before in baseline['routes'].items():
+        after = report['routes'].get(route)
+        if after is None:
+            regressions.append(f'{route}: missing from this run')
+            continue
+        for key in ('p50_ms', 'p95_ms', 'ttfb_p50_ms'):
+            if key in before and (after[key]
+                                  > before[key] * tolerance + slack_ms):
+                measured.append(
+                    f'{route}: {key} {after[key]} > baseline {before[key]}')
+        if (same_encoding and 'bytes' in before
+                and after['bytes'] > before['bytes'] * tolerance):
+            measured.append(
+                f'{route}: {after["bytes"]} bytes > baseline '
+                f'{before["bytes"]}')
+        if (before['queries_per_request'] is not None
+                and after['queries_per_request'] is not None
+                and after['queries_per_request']
+                > before['queries_per_request']):
+            regressions.append(
+                f'{route}: {after["queries_per_request"]} queries per '
+                f'request > baseline {before["queries_per_request"]}')
+        if after['server_errors'] > before['server_errors']:
+            regressions.append(
+                f'{route}: {after["server_errors"]} server errors')
+    if (baseline.get('peak_rss_kb') and report.get('peak_rss_kb')
+            and report['peak_rss_kb'] > baseline['peak_rss_kb'] * tolerance):
+        measured.append(f'peak RSS {report["peak_rss_kb"]} KiB > '
+                        f'baseline {baseline["peak_rss_kb"]} KiB')
+    return regressions, warnings
+
+
+def format_comparison(before, after):
+    """Yield one line per route with latency, TTFB and size before/after."""
+    yield (f'{"route":40} {"p50 ms":>17} {"ttfb p50 ms":>17} '
+           f'{"KiB on the wire":>19}')
+    for route in sorted(set(before['routes']) & set(after['routes'])):
+        old, new = before['routes'][route], after['routes'][route]
+        columns = []
+        for key, scale, width in (('p50_ms', 1, 7), ('ttfb_p50_ms', 1, 7),
+                                  ('bytes', 1024, 8)):
+            if key in old and key in new:
+                columns.append(f'{old[key] / scale:{width}.1f} -> '
+                               f'{new[key] / scale:<{width}.1f}')
+            else:
+                columns.append(f'{"n/a":>{width * 2 + 4}}')
+        yield f'{route[:40]:40} ' + ' '.join(columns)
+
+
+def load_report(path):
+    with open(path) as report_file:
+        return json.load(report_file)
+
+
+def save_report(report, path):
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2, sort_keys=True)
+        report_file.write('\n')
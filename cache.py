@@ -0,0 +1,261 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+from flask import Flask, current_app, g, make_response, request, session
+
+from jobs import enqueue, job
+from models import db
+
+
+class MemoryCache:
+    """Process-local LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (0, None))
+            self._data[key] = (value + 1, expires)
+            self._data.move_to_end(key)
+            return value + 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisCache:
+    """Cache shared between workers, backed by a Redis-compatible client.
+
+    Any object implementing ``get``, ``set(..., ex=)``, ``incr`` and
+    ``delete`` can be passed as ``client``, which lets tests swap in a
+    local stand-in.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                'CACHE_BACKEND "redis" requires the redis package')
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+class PageCache:
+    """Caches rendered GET pages by URL, grouped under invalidation tags.
+
+    Every tag has a generation counter stored in the backend and embedded
+    in the page keys, so invalidating a tag makes exactly the pages cached
+    under it (including every query-string variant) unreachable. Stale
+    entries then age out of the backend on their own.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def _generation(self, tag):
+        return self.backend.get(f'gen:{tag}') or 0
+
+    def key(self, tag):
+        # conditional() sets the page version, so a body cached before the
+        # validators moved is never served under the new ETag.
+        version = g.get('page_version', '')
+        return (f'page:{tag}:{self._generation(tag)}:{version}:'
+                f'{request.full_path}')
+
+    def data_key(self, tag, *parts):
+        """Key for derived data that is invalidated together with ``tag``."""
+        suffix = ':'.join(str(part) for part in parts)
+        return f'data:{tag}:{self._generation(tag)}:{suffix}'
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.incr(f'gen:{tag}')
+
+    def record(self, hit):
+        """Count a lookup; request threads share the counters."""
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+        }
+
+
+def _store_when_complete(chunks, page_cache, key):
+    """Pass a streamed page through, caching it once fully sent."""
+    body = []
+    try:
+        for chunk in chunks:
+            body.append(chunk if isinstance(chunk, str)
+                        else chunk.decode('utf-8'))
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    page_cache.backend.set(key, ''.join(body), page_cache.ttl)
+
+
+def cached(tag):
+    """Cache a view under ``tag``, formatted with the view's arguments."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            # Pages rendered while flash messages are pending would show
+            # (and swallow) them for every later visitor.
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(**kwargs)
+
+            page_cache = get_page_cache()
+            key = page_cache.key(tag.format(**kwargs))
+            body = page_cache.backend.get(key)
+            if body is not None:
+                page_cache.record(hit=True)
+                response = make_response(body)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            page_cache.record(hit=False)
+            response = make_response(view(**kwargs))
+            if response.status_code == 200 and response.is_streamed:
+                response.response = _store_when_complete(
+                    response.response, page_cache, key)
+            elif response.status_code == 200:
+                page_cache.backend.set(
+                    key, response.get_data(as_text=True), page_cache.ttl)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional(last_modified):
+    """Answer ``If-None-Match``/``If-Modified-Since`` before running a view.
+
+    ``last_modified`` receives the view's arguments and returns the naive
+    local time the page last changed, or ``None`` to let the view handle a
+    missing object. A match is answered with 304 without rendering.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            if session.get('_flashes'):
+                return view(**kwargs)
+            changed = last_modified(**kwargs)
+            if changed is None:
+                return view(**kwargs)
+
+            changed = changed.astimezone(timezone.utc)
+            key = '-'.join(str(value) for value in kwargs.values())
+            etag = f'{request.endpoint}-{key}-{changed.timestamp():.6f}'
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since:
+                not_modified = (changed.replace(microsecond=0)
+                                <= request.if_modified_since)
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                g.page_version = etag
+                response = make_response(view(**kwargs))
+            response.set_etag(etag, weak=True)
+            response.last_modified = changed
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+@job('warm-pages')
+def warm_pages(paths):
+    """Render ``paths`` so their next visitor gets a cache hit."""
+    client = current_app.test_client()
+    for path in paths:
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'Warming {path} returned {response.status}')
+
+
+def warm_later(*paths):
+    """Queue re-rendering of just invalidated pages in a background worker.
+
+    Only a backend shared with the worker benefits, so this does nothing
+    with the per-process memory cache.
+    """
+    if isinstance(get_page_cache().backend, RedisCache):
+        enqueue('warm-pages', paths=list(paths))
+        db.session.commit()
+
+
+def init_page_cache(app: Flask) -> PageCache:
+    backend_name = app.config['CACHE_BACKEND']
+    if backend_name == 'redis':
+        backend = RedisCache.from_url(app.config['CACHE_REDIS_URL'])
+    else:
+        backend = MemoryCache(app.config['CACHE_MAX_ENTRIES'])
+    page_cache = PageCache(backend, app.config['CACHE_DEFAULT_TTL'])
+    app.extensions['page_cache'] = page_cache
+    return page_cache
+
+
+def get_page_cache():
+    return current_app.extensions['page_cache']
@@ -0,0 +1,136 @@
+import zlib
+
+from flask import Flask, current_app, request
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'image/svg+xml',
+}
+
+
+class _Gzip:
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        # Sync flushes keep a streamed page arriving in pieces.
+        return (self._compressor.compress(data)
+                + self._compressor.flush(zlib.Z_SYNC_FLUSH))
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+
+    def __init__(self, quality):
+        import brotli
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _brotli_available():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _choose_encoding():
+    """The best encoding the client accepts: br, then gzip, else None."""
+    accepted = request.accept_encodings
+    if accepted['br'] and _brotli_available():
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressor(encoding, config):
+    if encoding == 'br':
+        return _Brotli(config['COMPRESS_BROTLI_QUALITY'])
+    return _Gzip(config['COMPRESS_LEVEL'])
+
+
+def _compressed_stream(head, rest, source, compressor):
+    try:
+        data = compressor.compress(head)
+        if data:
+            yield data
+        for chunk in rest:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def _plain_stream(head, rest, source):
+    try:
+        yield head
+        yield from rest
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def compress_response(response):
+    """Compress text responses of at least ``COMPRESS_MIN_SIZE`` bytes.
+
+    Streamed responses are read until the threshold is reached (or they
+    end) to decide, then compressed chunk by chunk as they are sent.
+    Files sent by ``send_file`` and responses that are already encoded,
+    such as the precompressed assets, are left alone.
+    """
+    if (response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.cache_control.no_transform):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    config = current_app.config
+    min_size = config['COMPRESS_MIN_SIZE']
+
+    if not response.is_streamed:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        compressor = _compressor(encoding, config)
+        response.set_data(compressor.compress(data) + compressor.finish())
+        response.content_encoding = encoding
+        return response
+
+    source = response.response
+    chunks = response.iter_encoded()
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= min_size:
+            break
+    else:
+        response.response = _plain_stream(head, (), source)
+        return response
+    response.response = _compressed_stream(
+        head, chunks, source, _compressor(encoding, config))
+    response.content_encoding = encoding
+    response.headers.pop('Content-Length', None)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    app.after_request(compress_response)
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from models import Artist, Show, Venue, db
+
+EXPORT_COLUMNS = ('show_id', 'start_time', 'artist_id', 'artist_name',
+                  'venue_id', 'venue_name')
+
+
+def show_catalogue_batches(batch_size=1000):
+    """Yield lists of plain show rows from a server-side cursor.
+
+    Artist and venue names are joined in SQL and no ORM objects are built,
+    so memory stays bounded by ``batch_size`` whatever the table size.
+    """
+    stmt = select(
+        Show.id, Show.start_time, Artist.id, Artist.name, Venue.id, Venue.name
+    ).join(Artist, Show.artist_id == Artist.id).join(
+        Venue, Show.venue_id == Venue.id
+    ).order_by(Show.start_time, Show.id).execution_options(
+        yield_per=batch_size)
+    result = db.session.execute(stmt)
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _as_record(row):
+    record = dict(zip(EXPORT_COLUMNS, row))
+    record['start_time'] = record['start_time'].isoformat()
+    return record
+
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(
+            tuple(_as_record(row).values()) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(batches):
+    for batch in batches:
+        yield ''.join(json.dumps(_as_record(row)) + '\n' for row in batch)
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'jsonl': (jsonl_chunks, 'application/x-ndjson'),
+}
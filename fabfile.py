@@ -5,11 +5,19 @@ from fabric.contrib.console import confirm
 
 
 def test():
+    with settings(warn_only=True):
+        result = local("python -m pytest tests", capture=True)
+    if result.failed and not confirm("Tests failed. Continue?"):
+        abort("Aborted at user request.")
+
+
+def bench():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python -m benchmarks run --baseline benchmarks/baseline.json",
+            capture=True
         )
-    if result.failed and not confirm("Tests failed. Continue?"):
+    if result.failed and not confirm("Benchmarks regressed. Continue?"):
         abort("Aborted at user request.")
 
 
@@ -24,6 +32,7 @@ def push():
 
 def prepare():
     test()
+    bench()
     commit()
     push()
 
@@ -47,6 +56,7 @@ def heroku_test():
 def deploy():
     pull()
     test()
+    bench()
     commit()
     heroku()
     heroku_test()
@@ -1,5 +1,7 @@
 from datetime import datetime
-from flask import Flask
+from flask import Flask, url_for
+
+from assets import asset_url
 
 
 def register_template_filters(app: Flask) -> None:
@@ -8,22 +10,6 @@ def register_template_filters(app: Flask) -> None:
     def length_filter(value):
         return len(value)
     
-    @app.template_filter('filter_shows')
-    def upcoming_filter(value, upcoming:bool = True):
-        upcoming_shows = []
-        past_shows = []
-        current_time = datetime.now()
-
-        for show in value.shows:
-            if show.start_time > current_time:
-                upcoming_shows.append(show)
-            else:
-                past_shows.append(show)
-        if upcoming:
-            return upcoming_shows
-        else:
-            return past_shows
-
     @app.template_filter('format_datetime')
     def format_datetime(value):
         if isinstance(value, str):
@@ -36,4 +22,13 @@ def register_template_filters(app: Flask) -> None:
                     return value
         else:
             date = value
-        return date.strftime('%Y-%m-%d %H:%M:%S')
\ No newline at end of file
+        return date.strftime('%Y-%m-%d %H:%M:%S')
+
+    @app.template_filter('thumbnail')
+    def thumbnail(owner):
+        """Thumbnail URL of a venue or artist, or a broken-link placeholder."""
+        if owner.thumbnail:
+            return url_for('main.thumbnail', name=owner.thumbnail)
+        if owner.image_error:
+            return asset_url('img/placeholder.svg')
+        return owner.image_link
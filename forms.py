@@ -1,10 +1,13 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 
 from flask_wtf import FlaskForm
-from wtforms import (BooleanField, DateTimeField, SelectField,
+from wtforms import (BooleanField, DateTimeField, IntegerField, SelectField,
                      SelectMultipleField, StringField)
-from wtforms.validators import URL, AnyOf, DataRequired, Optional, Regexp
+from wtforms.validators import (URL, AnyOf, DataRequired, NumberRange,
+                                Optional, Regexp)
+
+from models import DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION, Show
 
 
 class GenreEnum(str, Enum):
@@ -95,17 +98,55 @@ class StateEnum(str, Enum):
         return [state.value for state in cls]
 
 class ShowForm(FlaskForm):
-    artist_id = StringField(
-        'artist_id'
+    artist_id = IntegerField(
+        'artist_id', validators=[DataRequired(), NumberRange(min=1)]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[DataRequired(), NumberRange(min=1)]
     )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default= datetime.today()
     )
+    duration = IntegerField(
+        'duration',
+        validators=[
+            Optional(),
+            NumberRange(min=1, max=MAX_SHOW_DURATION // timedelta(minutes=1))
+        ],
+        default=DEFAULT_SHOW_DURATION // timedelta(minutes=1)
+    )
+
+    @property
+    def end_time(self):
+        if self.duration.data:
+            return self.start_time.data + timedelta(minutes=self.duration.data)
+        return self.start_time.data + DEFAULT_SHOW_DURATION
+
+    def validate(self, extra_validators=None):
+        if not super().validate(extra_validators):
+            return False
+        # Both ids are checked in one round trip, before any INSERT.
+        artist_exists, venue_exists = Show.references_exist(
+            self.artist_id.data, self.venue_id.data)
+        if not artist_exists:
+            self.artist_id.errors.append('There is no artist with this ID.')
+        if not venue_exists:
+            self.venue_id.errors.append('There is no venue with this ID.')
+        if not (artist_exists and venue_exists):
+            return False
+
+        clashes = Show.overlapping(self.venue_id.data, self.artist_id.data,
+                                   self.start_time.data, self.end_time)
+        for show in clashes:
+            booked = ('The venue' if show.venue_id == self.venue_id.data
+                      else 'The artist')
+            self.start_time.errors.append(
+                f'{booked} is already booked from '
+                f'{show.start_time:%Y-%m-%d %H:%M} to '
+                f'{show.end_time:%Y-%m-%d %H:%M}.')
+        return not clashes
 
 class VenueForm(FlaskForm):
     name = StringField(
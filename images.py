@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import io
+import ipaddress
+import os
+import re
+import socket
+import ssl
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import bindparam, event, select, union, update
+from sqlalchemy.orm import attributes
+
+from cache import get_page_cache
+from jobs import enqueue, job
+from models import Artist, Show, Venue, db
+
+IMAGE_MODELS = (Venue, Artist)
+THUMBNAIL_NAME = re.compile(r'^[0-9a-f]{64}\.(webp|jpeg|png)$')
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Links checked per transaction by verify_images.
+BATCH_SIZE = 500
+
+
+class ImageError(Exception):
+    """A remote image that cannot be used; the message is shown to staff."""
+
+
+async def _resolve_public(host, port):
+    """Resolve ``host`` and return an address that is safe to connect to.
+
+    Image links are typed in by users, so every address the name resolves
+    to must be global: loopback, private, link-local and other reserved
+    ranges would let a link probe the internal network.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise ImageError('Image host could not be resolved')
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0])
+        address = getattr(address, 'ipv4_mapped', None) or address
+        if not address.is_global or address.is_multicast:
+            raise ImageError('Image link does not point to a public address')
+    return infos[0][4][0]
+
+
+async def _read_body(reader, headers, max_bytes):
+    """Read a response body, refusing to buffer more than ``max_bytes``."""
+    body = bytearray()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                return bytes(body)
+            if len(body) + size > max_bytes:
+                raise ImageError(f'Image is larger than {max_bytes} bytes')
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+    while True:
+        chunk = await reader.read(64 * 1024)
+        if not chunk:
+            return bytes(body)
+        body += chunk
+        if len(body) > max_bytes:
+            raise ImageError(f'Image is larger than {max_bytes} bytes')
+
+
+async def fetch(url, max_bytes, max_redirects=3):
+    """GET ``url`` over asyncio streams and return the response body.
+
+    A deliberately small HTTP/1.1 client: one request per connection,
+    following up to ``max_redirects`` redirects, and giving up as soon as
+    the declared or received size exceeds ``max_bytes``. Every hop is
+    resolved and checked by ``_resolve_public`` and the connection goes to
+    the checked address, so DNS cannot swap in another one in between.
+    """
+    for _ in range(max_redirects + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ImageError('Image link is not an http(s) URL')
+        secure = parts.scheme == 'https'
+        port = parts.port or (443 if secure else 80)
+        address = await _resolve_public(parts.hostname, port)
+        reader, writer = await asyncio.open_connection(
+            address, port,
+            ssl=ssl.create_default_context() if secure else None,
+            server_hostname=parts.hostname if secure else None)
+        try:
+            target = parts.path or '/'
+            if parts.query:
+                target += f'?{parts.query}'
+            writer.write((f'GET {target} HTTP/1.1\r\n'
+                          f'Host: {parts.netloc}\r\n'
+                          'User-Agent: Fyyur image checker\r\n'
+                          'Accept: image/*\r\n'
+                          'Connection: close\r\n\r\n').encode('latin-1'))
+            await writer.drain()
+
+            status_line = (await reader.readline()).decode('latin-1')
+            try:
+                status = int(status_line.split()[1])
+            except (IndexError, ValueError):
+                raise ImageError('Malformed HTTP response')
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            if status in REDIRECT_STATUSES and 'location' in headers:
+                url = urljoin(url, headers['location'])
+                continue
+            if status != 200:
+                raise ImageError(f'Image link answered HTTP {status}')
+            if int(headers.get('content-length') or 0) > max_bytes:
+                raise ImageError(f'Image is larger than {max_bytes} bytes')
+            return await _read_body(reader, headers, max_bytes)
+        finally:
+            writer.close()
+    raise ImageError('Too many redirects')
+
+
+def make_thumbnail(body, size, fmt, max_pixels):
+    """Verify that ``body`` decodes as an image and return a resized copy."""
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError('Image verification requires the Pillow package')
+
+    try:
+        with Image.open(io.BytesIO(body)) as image:
+            if image.width * image.height > max_pixels:
+                raise ImageError(
+                    f'Image is {image.width}x{image.height} pixels')
+            image.verify()
+        # verify() leaves the image unusable, so decode it again.
+        with Image.open(io.BytesIO(body)) as image:
+            image.thumbnail(size)
+            if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, fmt)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ImageError(f'Not a readable image ({type(e).__name__})')
+    return output.getvalue()
+
+
+def store_thumbnail(data, directory, fmt):
+    """Write ``data`` under its SHA-256 and return the file name.
+
+    Identical thumbnails share one file, and a name never changes its
+    contents, so it can be cached by browsers forever.
+    """
+    name = f'{hashlib.sha256(data).hexdigest()}.{fmt.lower()}'
+    path = thumbnail_path(directory, name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f'{path}.{os.getpid()}.tmp'
+        with open(partial, 'wb') as output:
+            output.write(data)
+        os.replace(partial, path)
+    return name
+
+
+def thumbnail_path(directory, name):
+    """Thumbnails are spread over 256 subdirectories by name prefix."""
+    return os.path.join(directory, name[:2], name)
+
+
+async def _check_links(urls, config):
+    """Return ``{url: (thumbnail name or None, error or None)}``."""
+    loop = asyncio.get_running_loop()
+    limit = asyncio.Semaphore(config['IMAGE_FETCH_CONCURRENCY'])
+    size = tuple(config['IMAGE_THUMBNAIL_SIZE'])
+    fmt = config['IMAGE_THUMBNAIL_FORMAT']
+
+    async def check(url):
+        async with limit:
+            try:
+                body = await asyncio.wait_for(
+                    fetch(url, config['IMAGE_MAX_BYTES']),
+                    config['IMAGE_FETCH_TIMEOUT'])
+            except asyncio.TimeoutError:
+                return url, (None, 'Image link timed out')
+            except ImageError as e:
+                return url, (None, str(e))
+            except (OSError, EOFError, UnicodeError, ValueError):
+                # The raw error would tell which ports answer and how.
+                return url, (None, 'Image link could not be fetched')
+        # Decoding and resizing are CPU bound; keep them off the loop.
+        try:
+            thumbnail = await loop.run_in_executor(
+                None, make_thumbnail, body, size, fmt,
+                config['IMAGE_MAX_PIXELS'])
+        except ImageError as e:
+            return url, (None, str(e))
+        name = await loop.run_in_executor(
+            None, store_thumbnail, thumbnail, config['IMAGE_CACHE_DIR'], fmt)
+        return url, (name, None)
+
+    return dict(await asyncio.gather(*(check(url) for url in urls)))
+
+
+def _record(results, now):
+    """Store check results on every venue and artist using each link."""
+    tags = set()
+    for model in IMAGE_MODELS:
+        kind = model.__tablename__
+        ids = db.session.scalars(select(model.id).where(
+            model.image_link.in_(results))).all()
+        if not ids:
+            continue
+        table = model.__table__
+        db.session.execute(
+            update(table).where(
+                table.c.image_link == bindparam('checked_link')
+            ).values(thumbnail=bindparam('checked_thumbnail'),
+                     image_error=bindparam('checked_error'),
+                     image_checked_at=now),
+            [{'checked_link': url, 'checked_thumbnail': name,
+              'checked_error': error and error[:200]}
+             for url, (name, error) in results.items()])
+        model.touch(ids)
+        # Show tiles on the other side render these images too.
+        fk = getattr(Show, model._show_fk)
+        counterpart = Artist if model is Venue else Venue
+        other_fk = getattr(Show, counterpart._show_fk)
+        counterpart_ids = db.session.scalars(
+            select(other_fk).where(fk.in_(ids)).distinct()).all()
+        counterpart.touch(counterpart_ids)
+        tags.update(f'{kind}:{owner_id}' for owner_id in ids)
+        tags.update(f'{counterpart.__tablename__}:{owner_id}'
+                    for owner_id in counterpart_ids)
+    db.session.commit()
+    if tags:
+        get_page_cache().invalidate('venues', 'artists', 'shows', *tags)
+
+
+def unchecked_links(recheck=False):
+    """Distinct image links of venues and artists not verified yet."""
+    selects = []
+    for model in IMAGE_MODELS:
+        links = select(model.image_link)
+        if not recheck:
+            links = links.where(model.image_checked_at.is_(None))
+        selects.append(links)
+    return db.session.scalars(union(*selects)).all()
+
+
+@job('verify-images')
+def verify_images(urls=None, recheck=False):
+    """Fetch, verify and thumbnail image links, ``BATCH_SIZE`` at a time.
+
+    ``urls`` defaults to every link not checked yet (or every link with
+    ``recheck``). Returns ``{url: (thumbnail, error)}``.
+    """
+    if urls is None:
+        urls = unchecked_links(recheck)
+    config = current_app.config
+    results = {}
+    for start in range(0, len(urls), BATCH_SIZE):
+        batch = asyncio.run(_check_links(urls[start:start + BATCH_SIZE],
+                                         config))
+        _record(batch, datetime.now())
+        results.update(batch)
+    return results
+
+
+@event.listens_for(db.session, 'before_flush')
+def _reset_changed_links(session, flush_context, instances):
+    """Forget the old thumbnail of a changed link and queue the new one."""
+    changed = set()
+    for obj in session.new | session.dirty:
+        if not isinstance(obj, IMAGE_MODELS):
+            continue
+        if obj in session.new or attributes.get_history(
+                obj, 'image_link').has_changes():
+            obj.thumbnail = obj.image_error = obj.image_checked_at = None
+            changed.add(obj.image_link)
+    if changed:
+        enqueue('verify-images', urls=sorted(changed))
+
+
+def register_image_commands(app: Flask) -> None:
+
+    @app.cli.command('verify-images')
+    @click.option('--recheck', is_flag=True,
+                  help='Check every link again, not only new ones.')
+    def verify_images_command(recheck):
+        """Fetch and thumbnail venue and artist images; list broken ones."""
+        results = verify_images(recheck=recheck)
+        broken = {url: error for url, (_, error) in results.items() if error}
+        for url, error in sorted(broken.items()):
+            click.echo(f'{url}: {error}')
+        click.echo(f'Checked {len(results)} links, {len(broken)} broken')
@@ -0,0 +1,313 @@
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from flask import Flask
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from wtforms.fields.core import UnboundField
+from wtforms.validators import StopValidation, ValidationError
+
+from forms import ArtistForm, ShowForm, VenueForm
+from models import (DEFAULT_SHOW_DURATION, Artist, Show, Venue, artist_genres,
+                    db, venue_genres)
+from scheduling import split_conflicts
+from utils import get_or_create_areas, get_or_create_genres
+
+TRUE_VALUES = ('1', 'true', 't', 'yes', 'y', 'on')
+
+
+class _RowField:
+    """Minimal stand-in for a bound WTForms field, enough for validators."""
+
+    def __init__(self, data):
+        self.data = data
+        if data is None:
+            self.raw_data = []
+        elif isinstance(data, list):
+            self.raw_data = data
+        else:
+            self.raw_data = [data]
+        self.errors = []
+
+    @staticmethod
+    def gettext(string):
+        return string
+
+    @staticmethod
+    def ngettext(singular, plural, n):
+        return singular if n == 1 else plural
+
+
+class RowValidator:
+    """Applies the validators declared on a form class to plain dict rows.
+
+    The validator chains are collected once from the form's unbound fields,
+    so no WTForms form object is built per row.
+    """
+
+    def __init__(self, form_class):
+        self.fields = {}
+        for name in dir(form_class):
+            unbound = getattr(form_class, name)
+            if isinstance(unbound, UnboundField):
+                choices = unbound.kwargs.get('choices')
+                self.fields[name] = (
+                    unbound.kwargs.get('validators', []),
+                    {value for value, _ in choices} if choices else None
+                )
+
+    def errors(self, row):
+        errors = []
+        for name, (validators, choices) in self.fields.items():
+            field = _RowField(row.get(name))
+            if choices is not None and field.raw_data and any(
+                    value not in choices for value in field.raw_data):
+                errors.append(f'{name}: Not a valid choice.')
+                continue
+            for validator in validators:
+                try:
+                    validator(None, field)
+                except StopValidation as e:
+                    if e.args and e.args[0]:
+                        errors.append(f'{name}: {e.args[0]}')
+                    break
+                except ValidationError as e:
+                    errors.append(f'{name}: {e.args[0]}')
+        return errors
+
+
+class MalformedRow:
+    """Placeholder for an input line that could not be parsed into a row."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield MalformedRow(f'not valid JSON ({e.msg})')
+                continue
+            yield row if isinstance(row, dict) else MalformedRow(
+                'not a JSON object')
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+def _as_list(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _coerce_profile(row, seeking_field):
+    row = {key: value for key, value in row.items() if value is not None}
+    row['genres'] = _as_list(row.get('genres'))
+    row[seeking_field] = _as_bool(row.get(seeking_field))
+    return row
+
+
+def _coerce_show(row):
+    row = dict(row)
+    try:
+        if row.get('start_time') and not isinstance(row['start_time'],
+                                                    datetime):
+            row['start_time'] = datetime.fromisoformat(row['start_time'])
+        if row.get('start_time') and row['start_time'].tzinfo is not None:
+            # Shows are stored as naive local times.
+            row['start_time'] = row['start_time'].astimezone().replace(
+                tzinfo=None)
+        row['artist_id'] = int(row['artist_id'])
+        row['venue_id'] = int(row['venue_id'])
+        if row.get('duration') in (None, ''):
+            row['duration'] = None
+        else:
+            row['duration'] = int(row['duration'])
+    except (KeyError, TypeError, ValueError):
+        row['start_time'] = row['duration'] = None
+    if row.get('start_time'):
+        row['end_time'] = row['start_time'] + (
+            timedelta(minutes=row['duration']) if row.get('duration')
+            else DEFAULT_SHOW_DURATION)
+    return row
+
+
+def _insert_profiles(model, links, link_column, rows, columns):
+    """Insert venues or artists plus their genre links for one batch."""
+    area_ids = get_or_create_areas(
+        [(row['city'], row['state']) for row in rows], db)
+    genre_ids = {genre.name: genre.id for genre in get_or_create_genres(
+        [name for row in rows for name in row['genres']], db)}
+
+    values = [dict(
+        {column: row.get(field, '') for column, field in columns.items()},
+        area_id=area_ids[(row['city'], row['state'])]
+    ) for row in rows]
+    ids = db.session.scalars(
+        insert(model).returning(model.id, sort_by_parameter_order=True),
+        values
+    ).all()
+    genre_links = [
+        {link_column: row_id, 'genre_id': genre_ids[name]}
+        for row_id, row in zip(ids, rows)
+        for name in dict.fromkeys(row['genres'])
+    ]
+    if genre_links:
+        db.session.execute(links.insert(), genre_links)
+    return len(ids)
+
+
+def import_venues(rows):
+    return _insert_profiles(Venue, venue_genres, 'venue_id', rows, {
+        'name': 'name',
+        'address': 'address',
+        'phone': 'phone',
+        'image_link': 'image_link',
+        'facebook_link': 'facebook_link',
+        'website': 'website_link',
+        'seeking_talent': 'seeking_talent',
+        'seeking_description': 'seeking_description',
+    })
+
+
+def import_artists(rows):
+    return _insert_profiles(Artist, artist_genres, 'artist_id', rows, {
+        'name': 'name',
+        'phone': 'phone',
+        'image_link': 'image_link',
+        'facebook_link': 'facebook_link',
+        'website': 'website_link',
+        'seeking_venue': 'seeking_venue',
+        'seeking_description': 'seeking_description',
+    })
+
+
+def import_shows(rows):
+    values = [{key: row[key] for key in ('artist_id', 'venue_id',
+                                          'start_time', 'end_time')}
+              for row in rows]
+    if values:
+        db.session.execute(insert(Show), values)
+        venue_ids = {row['venue_id'] for row in values}
+        artist_ids = {row['artist_id'] for row in values}
+        Venue.touch(venue_ids)
+        Artist.touch(artist_ids)
+        Venue.refresh_show_counts(venue_ids)
+        Artist.refresh_show_counts(artist_ids)
+    return len(values)
+
+
+def _split_references(rows):
+    """Split shows into ``(known, unknown)`` by artist/venue existence.
+
+    Costs one query per referenced table for the whole batch.
+    """
+    artist_ids = set(db.session.scalars(select(Artist.id).where(
+        Artist.id.in_({row['artist_id'] for row in rows}))))
+    venue_ids = set(db.session.scalars(select(Venue.id).where(
+        Venue.id.in_({row['venue_id'] for row in rows}))))
+    known, unknown = [], []
+    for row in rows:
+        if row['artist_id'] in artist_ids and row['venue_id'] in venue_ids:
+            known.append(row)
+        else:
+            unknown.append(row)
+    return known, unknown
+
+
+IMPORTERS = {
+    'venues': (VenueForm, lambda row: _coerce_profile(row, 'seeking_talent'),
+               import_venues),
+    'artists': (ArtistForm, lambda row: _coerce_profile(row, 'seeking_venue'),
+                import_artists),
+    'shows': (ShowForm, _coerce_show, import_shows),
+}
+
+
+def run_import(kind, rows, batch_size, echo=click.echo):
+    """Validate and insert ``rows`` in batches, one transaction per batch.
+
+    Returns ``(imported, rejected)``.
+    """
+    form_class, coerce, import_batch = IMPORTERS[kind]
+    validator = RowValidator(form_class)
+    imported = rejected = 0
+    started = time.perf_counter()
+    numbered = enumerate(rows, start=1)
+
+    while True:
+        chunk = list(islice(numbered, batch_size))
+        if not chunk:
+            break
+
+        valid = []
+        for line, row in chunk:
+            if isinstance(row, MalformedRow):
+                rejected += 1
+                echo(f'row {line}: {row.error}', err=True)
+                continue
+            row = coerce(row)
+            errors = validator.errors(row)
+            if errors:
+                rejected += 1
+                echo(f'row {line}: {"; ".join(errors)}', err=True)
+            else:
+                valid.append(row)
+
+        try:
+            if kind == 'shows' and valid:
+                valid, unknown = _split_references(valid)
+                for row in unknown:
+                    rejected += 1
+                    echo(f'show {row["artist_id"]}@{row["venue_id"]}: '
+                         'unknown artist or venue', err=True)
+                valid, conflicting = split_conflicts(valid)
+                for row in conflicting:
+                    rejected += 1
+                    echo(f'show {row["artist_id"]}@{row["venue_id"]} at '
+                         f'{row["start_time"]}: venue or artist already '
+                         'booked', err=True)
+            if valid:
+                imported += import_batch(valid)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+
+        elapsed = time.perf_counter() - started
+        echo(f'{kind}: {imported} imported, {rejected} rejected '
+             f'({imported / elapsed:.0f} rows/sec)')
+    return imported, rejected
+
+
+def register_import_command(app: Flask) -> None:
+
+    @app.cli.command('import-data')
+    @click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+                  help='Input format; guessed from the file extension.')
+    @click.option('--batch-size', default=1000, show_default=True)
+    def import_data(kind, source, fmt, batch_size):
+        """Bulk-load venues, artists or shows from a CSV or JSONL file."""
+        if fmt is None:
+            fmt = 'csv' if source.name.endswith('.csv') else 'jsonl'
+        try:
+            run_import(kind, read_rows(source, fmt), batch_size)
+        except SQLAlchemyError as e:
+            raise click.ClickException(f'Import aborted: {e}')
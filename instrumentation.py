@@ -0,0 +1,128 @@
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from models import db
+
+
+class QueryStats:
+    """Statements run while serving one request."""
+
+    def __init__(self, keep_slowest):
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total += elapsed
+        entry = (elapsed, statement)
+        if len(self.slowest) < self.keep_slowest:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+
+class EndpointStats:
+    """Query totals per endpoint, accumulated over the process lifetime."""
+
+    def __init__(self, keep_slowest):
+        self.keep_slowest = keep_slowest
+        self._lock = threading.Lock()
+        self._data = defaultdict(
+            lambda: {'requests': 0, 'queries': 0, 'db_time': 0.0,
+                     'slowest': []})
+
+    def add(self, endpoint, stats):
+        with self._lock:
+            entry = self._data[endpoint]
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['db_time'] += stats.total
+            entry['slowest'] = heapq.nlargest(
+                self.keep_slowest, entry['slowest'] + stats.slowest)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(entry)
+                    for endpoint, entry in self._data.items()}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'query_stats' in g:
+        g.query_stats.record(statement, elapsed)
+        threshold = current_app.config['SLOW_QUERY_MS'] / 1000
+        if elapsed > threshold:
+            current_app.logger.warning(
+                'Slow query (%.1f ms) in %s: %s',
+                elapsed * 1000, request.endpoint, statement)
+
+
+def _handle_error(context):
+    # after_cursor_execute does not fire for failed statements.
+    if context.connection is not None:
+        started = context.connection.info.get('query_started')
+        if started:
+            started.pop()
+
+
+def init_query_stats(app: Flask) -> None:
+    """Count statements and DB time per request and report slow requests.
+
+    Totals are sent back as ``Server-Timing`` headers and accumulated per
+    endpoint in ``app.extensions['query_stats']``.
+    """
+    keep_slowest = app.config['QUERY_STATS_SLOWEST']
+    app.extensions['query_stats'] = EndpointStats(keep_slowest)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute',
+                         _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_query_stats():
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats(keep_slowest)
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - g.pop('request_started')
+        endpoint = request.endpoint or 'unmatched'
+        app.extensions['query_stats'].add(endpoint, stats)
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.total * 1000:.1f};desc="{stats.count} queries"')
+        response.headers.add('Server-Timing',
+                             f'app;dur={elapsed * 1000:.1f}')
+
+        if elapsed * 1000 > app.config['SLOW_REQUEST_MS']:
+            slowest = '; '.join(
+                f'{duration * 1000:.1f} ms: {statement}'
+                for duration, statement in sorted(stats.slowest,
+                                                  reverse=True))
+            app.logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries, '
+                '%.1f ms in the database. Slowest: %s',
+                request.method, request.path, endpoint, elapsed * 1000,
+                stats.count, stats.total * 1000, slowest)
+        return response
@@ -0,0 +1,218 @@
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import delete, select, update
+
+from models import Job, db
+
+JOBS = {}
+
+# How often a worker requeues abandoned jobs and purges finished ones.
+HOUSEKEEPING_INTERVAL = timedelta(minutes=1)
+
+
+def job(name):
+    """Register a function as the handler of jobs called ``name``.
+
+    The handler runs in its own app context and receives the job payload
+    as keyword arguments. Raising retries the job with backoff; handlers
+    must therefore be safe to run more than once.
+    """
+    def decorator(func):
+        JOBS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, delay=0, max_attempts=None, **payload):
+    """Add a job to the current session and return it.
+
+    The job is only visible to workers once the caller commits, so work
+    queued alongside a change is dropped if that change rolls back.
+    """
+    if name not in JOBS:
+        raise ValueError(f'Unknown job {name!r}')
+    queued = Job(name=name, payload=payload,
+                 max_attempts=max_attempts
+                 or current_app.config['JOB_MAX_ATTEMPTS'],
+                 run_at=datetime.now() + timedelta(seconds=delay))
+    db.session.add(queued)
+    return queued
+
+
+def retry_delay(attempts, base, cap):
+    """Exponential backoff with up to 25% jitter, in seconds."""
+    delay = min(base * 2 ** (attempts - 1), cap)
+    return delay * random.uniform(1, 1.25)
+
+
+class Worker:
+    """Claims due jobs from the ``job`` table and runs them in a thread pool.
+
+    A job is claimed by flipping its status from ``queued`` to ``running``
+    in one guarded UPDATE, so any number of workers, in any number of
+    processes, can share the table. On PostgreSQL the candidate row is
+    picked with ``FOR UPDATE SKIP LOCKED`` so workers do not contend for
+    the same row. Jobs left ``running`` for longer than ``lease`` seconds
+    belong to a worker that died and are queued again.
+    """
+
+    def __init__(self, app, threads, poll_interval, lease):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self._housekept = None
+
+    def claim(self):
+        """Mark the next due job as running and return its id, or None."""
+        while True:
+            now = datetime.now()
+            job_id = db.session.scalar(
+                select(Job.id).where(Job.status == 'queued',
+                                     Job.run_at <= now)
+                .order_by(Job.run_at, Job.id).limit(1)
+                .with_for_update(skip_locked=True))
+            if job_id is None:
+                db.session.rollback()
+                return None
+            claimed = db.session.execute(
+                update(Job).where(Job.id == job_id, Job.status == 'queued')
+                .values(status='running', attempts=Job.attempts + 1,
+                        locked_at=now, locked_by=self.name)).rowcount
+            db.session.commit()
+            if claimed:
+                return job_id
+
+    def housekeep(self):
+        """Requeue jobs of dead workers and drop old finished jobs."""
+        now = datetime.now()
+        config = self.app.config
+        stale = [Job.status == 'running',
+                 Job.locked_at < now - timedelta(seconds=self.lease)]
+        db.session.execute(
+            update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+            .values(status='failed', finished_at=now,
+                    last_error='Worker lease expired'))
+        requeued = db.session.execute(
+            update(Job).where(*stale).values(
+                status='queued', run_at=now, locked_at=None,
+                locked_by=None)).rowcount
+        db.session.execute(
+            delete(Job).where(
+                Job.status == 'done',
+                Job.finished_at < now - timedelta(
+                    seconds=config['JOB_KEEP_FINISHED'])))
+        db.session.commit()
+        if requeued:
+            self.app.logger.warning('Requeued %d jobs of stopped workers',
+                                    requeued)
+
+    def execute(self, job_id):
+        with self.app.app_context():
+            claimed = db.session.get(Job, job_id)
+            handler = JOBS.get(claimed.name)
+            try:
+                if handler is None:
+                    raise LookupError(f'No handler for job {claimed.name!r}')
+                handler(**claimed.payload)
+            except Exception:
+                error = traceback.format_exc()
+                db.session.rollback()
+                self._failed(db.session.get(Job, job_id), error)
+            else:
+                claimed.status = 'done'
+                claimed.finished_at = datetime.now()
+                claimed.locked_at = claimed.locked_by = None
+            db.session.commit()
+
+    def _failed(self, failed, error):
+        config = self.app.config
+        failed.last_error = error
+        failed.locked_at = failed.locked_by = None
+        if failed.attempts >= failed.max_attempts:
+            failed.status = 'failed'
+            failed.finished_at = datetime.now()
+            self.app.logger.error('Job %d (%s) failed for good:\n%s',
+                                  failed.id, failed.name, error)
+            return
+        delay = retry_delay(failed.attempts, config['JOB_RETRY_BACKOFF'],
+                            config['JOB_MAX_BACKOFF'])
+        failed.status = 'queued'
+        failed.run_at = datetime.now() + timedelta(seconds=delay)
+        self.app.logger.warning('Job %d (%s) failed, retrying in %.0fs:\n%s',
+                                failed.id, failed.name, delay, error)
+
+    def run(self, burst=False):
+        """Work until stopped, or until no job is due when ``burst``."""
+        running = set()
+        with ThreadPoolExecutor(self.threads,
+                                thread_name_prefix='job') as pool:
+            while not self.stopping.is_set():
+                with self.app.app_context():
+                    now = datetime.now()
+                    if (self._housekept is None
+                            or now - self._housekept >= HOUSEKEEPING_INTERVAL):
+                        self.housekeep()
+                        self._housekept = now
+                    while len(running) < self.threads:
+                        job_id = self.claim()
+                        if job_id is None:
+                            break
+                        running.add(pool.submit(self.execute, job_id))
+                if burst and not running:
+                    break
+                if running:
+                    done, running = wait(running, timeout=self.poll_interval,
+                                         return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.exception() is not None:
+                            # The job stays running until its lease expires.
+                            self.app.logger.error(
+                                'Worker thread crashed',
+                                exc_info=future.exception())
+                else:
+                    self.stopping.wait(self.poll_interval)
+
+    def stop(self, *args):
+        self.stopping.set()
+
+
+def register_job_commands(app: Flask) -> None:
+
+    @app.cli.command('worker')
+    @click.option('--threads', type=int,
+                  help='Jobs run at once; defaults to JOB_WORKER_THREADS.')
+    @click.option('--burst', is_flag=True,
+                  help='Exit once no job is due instead of polling.')
+    def worker_command(threads, burst):
+        """Run queued background jobs until interrupted."""
+        config = current_app.config
+        worker = Worker(current_app._get_current_object(),
+                        threads or config['JOB_WORKER_THREADS'],
+                        config['JOB_POLL_INTERVAL'], config['JOB_LEASE'])
+        # Finish the jobs in hand before exiting on Ctrl-C or a deploy.
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+        click.echo(f'Worker {worker.name} running {", ".join(sorted(JOBS))}')
+        worker.run(burst=burst)
+
+    @app.cli.command('enqueue-job')
+    @click.argument('name', type=click.Choice(sorted(JOBS)))
+    @click.argument('arguments', nargs=-1)
+    def enqueue_command(name, arguments):
+        """Queue a job, passing KEY=VALUE arguments; e.g. from cron."""
+        payload = dict(argument.split('=', 1) for argument in arguments)
+        queued = enqueue(name, **payload)
+        db.session.commit()
+        click.echo(f'Queued job {queued.id}')
@@ -0,0 +1,252 @@
+import operator
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import defaultdict
+
+from flask import Flask, current_app, g, request
+from jinja2 import Template
+from sqlalchemy.pool import QueuePool
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+
+class _ShardOwner:
+    """Lives in a thread's locals; its finalizer retires the thread's shard."""
+
+
+class _Sharded:
+    """Per-thread shards so that recording never takes a lock.
+
+    Each thread writes only to its own shard; the lock is taken once per
+    thread to register the shard, when the thread exits and its shard is
+    folded into the retired totals, and by ``collect`` when scraping. A
+    thread-per-request server therefore keeps one shard per live thread.
+    """
+
+    def __init__(self, new_value, combine):
+        self._new_value = new_value
+        self._combine = combine
+        self._local = threading.local()
+        self._shards = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = defaultdict(self._new_value)
+            owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard)
+            with self._lock:
+                self._shards[id(shard)] = shard
+            self._local.shard = shard
+            self._local.owner = owner
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            for labels, value in list(shard.items()):
+                retired = self._retired.get(labels)
+                self._retired[labels] = (value if retired is None
+                                         else self._combine(retired, value))
+            del self._shards[id(shard)]
+
+    def _items(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            retired = list(self._retired.items())
+        yield from retired
+        for shard in shards:
+            yield from list(shard.items())
+
+
+class Counter(_Sharded):
+
+    def __init__(self):
+        super().__init__(int, operator.add)
+
+    def inc(self, labels, amount=1):
+        self._shard()[labels] += amount
+
+    def collect(self):
+        totals = defaultdict(int)
+        for labels, value in self._items():
+            totals[labels] += value
+        return totals
+
+
+def _add_buckets(total, value):
+    # A new list, so a scrape never sees a half-merged one.
+    return [a + b for a, b in zip(total, value)]
+
+
+class Histogram(_Sharded):
+    """Bucketed histogram; each shard keeps bucket counts plus the sum."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        super().__init__(lambda: [0] * (len(buckets) + 1) + [0.0],
+                         _add_buckets)
+
+    def observe(self, labels, value):
+        counts = self._shard()[labels]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def collect(self):
+        totals = {}
+        for labels, counts in self._items():
+            merged = totals.setdefault(labels, [0] * len(counts))
+            for index, value in enumerate(counts):
+                merged[index] += value
+        return totals
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.requests = Counter()
+        self.request_latency = Histogram()
+        self.render_latency = Histogram()
+        self.pool_checkout_wait = Histogram()
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            registry.pool_checkout_wait.observe(
+                (), time.perf_counter() - started)
+
+
+class TimedTemplate(Template):
+    """Jinja template class that records top-level render times."""
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            registry.render_latency.observe(
+                (self.name or '<string>',), time.perf_counter() - started)
+
+    def generate(self, *args, **kwargs):
+        """Streamed rendering, as used by ``stream_template``.
+
+        Only the time spent producing chunks counts, not the time the
+        response waits for the client in between. The sample is recorded
+        once the stream is exhausted or closed.
+        """
+        chunks = super().generate(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - started
+                yield chunk
+        finally:
+            chunks.close()
+            registry.render_latency.observe(
+                (self.name or '<string>',), elapsed)
+
+
+def _labels(names, values):
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}' if pairs else ''
+
+
+def _histogram_lines(name, help_text, label_names, histogram):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, counts in sorted(histogram.collect().items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ('+Inf',), counts):
+            cumulative += count
+            bucket = _labels(label_names + ('le',), labels + (bound,))
+            lines.append(f'{name}_bucket{bucket} {cumulative}')
+        suffix = _labels(label_names, labels)
+        lines.append(f'{name}_sum{suffix} {counts[-1]:.6f}')
+        lines.append(f'{name}_count{suffix} {cumulative}')
+    return lines
+
+
+def _sample_lines(name, help_text, label_names, values, kind='counter'):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+    for labels, value in sorted(values.items()):
+        lines.append(f'{name}{_labels(label_names, labels)} {value}')
+    return lines
+
+
+def render_metrics():
+    """Prometheus text exposition of this worker process' metrics."""
+    lines = []
+    lines += _sample_lines(
+        'fyyur_http_requests_total', 'HTTP requests served.',
+        ('endpoint', 'method', 'status'), registry.requests.collect())
+    lines += _histogram_lines(
+        'fyyur_http_request_duration_seconds', 'Request latency.',
+        ('endpoint', 'method'), registry.request_latency)
+    lines += _histogram_lines(
+        'fyyur_template_render_duration_seconds', 'Jinja render time.',
+        ('template',), registry.render_latency)
+    lines += _histogram_lines(
+        'fyyur_db_pool_checkout_wait_seconds',
+        'Time spent waiting for a pooled database connection.',
+        (), registry.pool_checkout_wait)
+
+    query_stats = current_app.extensions['query_stats'].snapshot()
+    lines += _sample_lines(
+        'fyyur_db_queries_total', 'SQL statements executed.', ('endpoint',),
+        {(endpoint,): stats['queries']
+         for endpoint, stats in query_stats.items()})
+    lines += _sample_lines(
+        'fyyur_db_time_seconds_total', 'Time spent in SQL statements.',
+        ('endpoint',),
+        {(endpoint,): round(stats['db_time'], 6)
+         for endpoint, stats in query_stats.items()})
+
+    cache_stats = current_app.extensions['page_cache'].stats()
+    lines += _sample_lines('fyyur_page_cache_hits_total',
+                           'Page cache hits.', (), {(): cache_stats['hits']})
+    lines += _sample_lines('fyyur_page_cache_misses_total',
+                           'Page cache misses.', (),
+                           {(): cache_stats['misses']})
+    lines += _sample_lines('fyyur_page_cache_hit_ratio',
+                           'Page cache hit ratio.', (),
+                           {(): round(cache_stats['hit_ratio'], 4)},
+                           kind='gauge')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app: Flask) -> None:
+    """Record request latency and template render times for ``/metrics``."""
+    app.jinja_env.template_class = TimedTemplate
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unmatched'
+            registry.request_latency.observe(
+                (endpoint, request.method), time.perf_counter() - started)
+            registry.requests.inc(
+                (endpoint, request.method, str(response.status_code)))
+        return response
@@ -0,0 +1,48 @@
+"""indexes on foreign keys and show start times
+
+Revision ID: 0f5b8e6d4c21
+Revises: 7e2c94b1a05d
+Create Date: 2026-10-18 10:41:52.270145
+
+"""
+from contextlib import nullcontext
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0f5b8e6d4c21'
+down_revision = '7e2c94b1a05d'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_show_venue_id_start_time', 'show', ['venue_id', 'start_time']),
+    ('ix_show_artist_id_start_time', 'show', ['artist_id', 'start_time']),
+    ('ix_show_start_time_id', 'show', ['start_time', 'id']),
+    ('ix_venue_area_id', 'venue', ['area_id']),
+    ('ix_artist_area_id', 'artist', ['area_id']),
+    ('ix_area_city_state', 'area', ['city', 'state']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY keeps the tables writable while the indexes
+    # build, but it cannot run inside a transaction on PostgreSQL.
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    block = (op.get_context().autocommit_block() if concurrently
+             else nullcontext())
+    with block:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns,
+                            postgresql_concurrently=concurrently)
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    block = (op.get_context().autocommit_block() if concurrently
+             else nullcontext())
+    with block:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=concurrently)
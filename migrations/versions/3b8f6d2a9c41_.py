@@ -0,0 +1,34 @@
+"""image link verification results on venue and artist
+
+Revision ID: 3b8f6d2a9c41
+Revises: e2a7c4b9f053
+Create Date: 2026-10-18 16:11:48.270935
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f6d2a9c41'
+down_revision = 'e2a7c4b9f053'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('thumbnail', sa.String(length=80),
+                                       nullable=True))
+        op.add_column(table, sa.Column('image_error', sa.String(length=200),
+                                       nullable=True))
+        op.add_column(table, sa.Column('image_checked_at', sa.DateTime(),
+                                       nullable=True))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('image_checked_at')
+            batch_op.drop_column('image_error')
+            batch_op.drop_column('thumbnail')
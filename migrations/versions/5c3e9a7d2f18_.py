@@ -0,0 +1,60 @@
+"""show end times and range indexes for overlap checks
+
+Revision ID: 5c3e9a7d2f18
+Revises: b8d0e3f71a96
+Create Date: 2026-10-18 12:41:55.203117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c3e9a7d2f18'
+down_revision = 'b8d0e3f71a96'
+branch_labels = None
+depends_on = None
+
+# Existing shows get the application's default length of two hours.
+BACKFILL = {
+    'postgresql': "start_time + interval '2 hours'",
+    'sqlite': "datetime(start_time, '+2 hours')",
+}
+
+# Plain GiST indexes rather than EXCLUDE constraints: shows that are
+# already double-booked would make adding the constraint fail.
+RANGE_INDEXES = {
+    'ix_show_venue_id_during': 'venue_id',
+    'ix_show_artist_id_during': 'artist_id',
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    op.add_column('show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute(f'UPDATE show SET end_time = {BACKFILL[dialect]}')
+    with op.batch_alter_table('show') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(),
+                              nullable=False)
+
+    if dialect != 'postgresql':
+        return
+    # btree_gist lets the integer foreign keys share a GiST index with the
+    # tsrange, so "this venue, overlapping this range" is one index scan.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    with op.get_context().autocommit_block():
+        for name, column in RANGE_INDEXES.items():
+            op.create_index(
+                name, 'show',
+                [column, sa.text('tsrange(start_time, end_time)')],
+                postgresql_using='gist', postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name in RANGE_INDEXES:
+                op.drop_index(name, table_name='show',
+                              postgresql_concurrently=True)
+    with op.batch_alter_table('show') as batch_op:
+        batch_op.drop_column('end_time')
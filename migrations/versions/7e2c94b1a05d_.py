@@ -0,0 +1,34 @@
+"""updated_at version markers on venue, artist and show
+
+Revision ID: 7e2c94b1a05d
+Revises: d3a1f0c2b7e4
+Create Date: 2026-10-18 10:03:17.502931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c94b1a05d'
+down_revision = 'd3a1f0c2b7e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite cannot add a column with a non-constant default, so add it
+    # empty, backfill it and set the default while the table is rebuilt.
+    for table in ('venue', 'artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(),
+                                       nullable=True))
+        op.execute(f'UPDATE {table} SET updated_at = CURRENT_TIMESTAMP')
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(),
+                                  server_default=sa.func.now(),
+                                  nullable=False)
+
+
+def downgrade():
+    for table in ('show', 'artist', 'venue'):
+        op.drop_column(table, 'updated_at')
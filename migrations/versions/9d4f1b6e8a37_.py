@@ -0,0 +1,55 @@
+"""denormalised upcoming/past show counters on venue and artist
+
+Revision ID: 9d4f1b6e8a37
+Revises: 5c3e9a7d2f18
+Create Date: 2026-10-18 13:27:40.118452
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f1b6e8a37'
+down_revision = '5c3e9a7d2f18'
+branch_labels = None
+depends_on = None
+
+BACKFILL = '''
+UPDATE {table} SET
+    upcoming_show_count = (SELECT COUNT(*) FROM show
+                           WHERE show.{table}_id = {table}.id
+                             AND show.start_time > :now),
+    past_show_count = (SELECT COUNT(*) FROM show
+                       WHERE show.{table}_id = {table}.id
+                         AND show.start_time <= :now),
+    next_show_at = (SELECT MIN(show.start_time) FROM show
+                    WHERE show.{table}_id = {table}.id
+                      AND show.start_time > :now)
+'''
+
+
+def upgrade():
+    # The app stores naive local times, so "now" comes from Python rather
+    # than from the database clock.
+    now = datetime.now()
+    for table in ('venue', 'artist'):
+        op.add_column(table, sa.Column('upcoming_show_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_show_count', sa.Integer(),
+                                       server_default='0', nullable=False))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(),
+                                       nullable=True))
+        op.create_index(f'ix_{table}_next_show_at', table, ['next_show_at'])
+        op.execute(sa.text(BACKFILL.format(table=table)).bindparams(now=now))
+
+
+def downgrade():
+    for table in ('artist', 'venue'):
+        op.drop_index(f'ix_{table}_next_show_at', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('next_show_at')
+            batch_op.drop_column('past_show_count')
+            batch_op.drop_column('upcoming_show_count')
@@ -0,0 +1,60 @@
+"""deduplicate areas and make (city, state) unique
+
+Revision ID: b8d0e3f71a96
+Revises: 0f5b8e6d4c21
+Create Date: 2026-10-18 11:20:08.931760
+
+"""
+from contextlib import nullcontext
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d0e3f71a96'
+down_revision = '0f5b8e6d4c21'
+branch_labels = None
+depends_on = None
+
+# The surviving row of each (city, state) group is the one with lowest id.
+DUPLICATES = '''(
+    SELECT id FROM area
+    WHERE id NOT IN (SELECT MIN(id) FROM area GROUP BY city, state)
+)'''
+KEEPER = '''(
+    SELECT MIN(keeper.id) FROM area duplicate
+    JOIN area keeper
+      ON keeper.city = duplicate.city AND keeper.state = duplicate.state
+    WHERE duplicate.id = {table}.area_id
+)'''
+
+
+def upgrade():
+    # Only rows pointing at a duplicate are rewritten, so tables without
+    # duplicates are left untouched instead of updated row by row.
+    for table in ('venue', 'artist'):
+        op.execute(f'UPDATE {table} SET area_id = '
+                   f'{KEEPER.format(table=table)} '
+                   f'WHERE area_id IN {DUPLICATES}')
+    op.execute(f'DELETE FROM area WHERE id IN {DUPLICATES}')
+
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    block = (op.get_context().autocommit_block() if concurrently
+             else nullcontext())
+    with block:
+        op.create_index('uq_area_city_state', 'area', ['city', 'state'],
+                        unique=True, postgresql_concurrently=concurrently)
+        op.drop_index('ix_area_city_state', table_name='area',
+                      postgresql_concurrently=concurrently)
+
+
+def downgrade():
+    # Merged duplicates cannot be restored; only the constraint is undone.
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    block = (op.get_context().autocommit_block() if concurrently
+             else nullcontext())
+    with block:
+        op.drop_index('uq_area_city_state', table_name='area',
+                      postgresql_concurrently=concurrently)
+        op.create_index('ix_area_city_state', 'area', ['city', 'state'],
+                        postgresql_concurrently=concurrently)
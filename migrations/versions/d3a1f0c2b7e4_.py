@@ -0,0 +1,36 @@
+"""trigram indexes for venue and artist name search
+
+Revision ID: d3a1f0c2b7e4
+Revises: 41ce47703393
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a1f0c2b7e4'
+down_revision = '41ce47703393'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm only exists on PostgreSQL; other databases use the in-process
+    # search fallback and need no index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_venue_name_trgm', 'venue', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_artist_name_trgm', 'artist', ['name'],
+                    postgresql_using='gin',
+                    postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_artist_name_trgm', table_name='artist')
+    op.drop_index('ix_venue_name_trgm', table_name='venue')
@@ -1,7 +1,18 @@
+from datetime import datetime, timedelta
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, case, exists, func, or_, select, tuple_
+from sqlalchemy.orm import joinedload
 
 db = SQLAlchemy()
 
+PAST_SHOWS_PER_PAGE = 12
+
+# Shows without an explicit end run for DEFAULT_SHOW_DURATION. Capping the
+# length lets overlap checks bound their start_time index range scans.
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+MAX_SHOW_DURATION = timedelta(hours=24)
+
 venue_genres = db.Table('venue_genres',
                         db.Column('venue_id', db.Integer, db.ForeignKey(
                             'venue.id'), primary_key=True),
@@ -32,11 +43,131 @@ class Area(db.Model):
     venues = db.relationship('Venue', backref='area', lazy=True)
     artists = db.relationship('Artist', backref='area', lazy=True)
 
+    __table_args__ = (
+        db.Index('uq_area_city_state', 'city', 'state', unique=True),
+    )
+
+
+class ShowScheduleMixin:
+    """Upcoming/past show queries for models that own a ``shows`` relation.
+
+    Subclasses set ``_show_fk`` to the name of the ``Show`` column pointing
+    back at them and ``_show_counterpart`` to the ``Show`` relationship that
+    the show tiles render (the artist for a venue and vice versa).
+    """
+    _show_fk = None
+    _show_counterpart = None
+
+    # Denormalised from ``show`` by ``refresh_show_counts`` so listings can
+    # show, sort and filter by them without joining. ``flask
+    # roll-over-shows`` moves shows that have started from upcoming to past.
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0,
+                                    server_default='0')
+    past_show_count = db.Column(db.Integer, nullable=False, default=0,
+                                server_default='0')
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    def _shows_query(self):
+        return Show.query.filter(
+            getattr(Show, self._show_fk) == self.id
+        ).options(joinedload(getattr(Show, self._show_counterpart)))
+
+    def show_counts(self, now=None):
+        """Return ``(upcoming, past)`` show counts in a single query."""
+        now = now or datetime.now()
+        upcoming, past = db.session.query(
+            func.count(case((Show.start_time > now, 1))),
+            func.count(case((Show.start_time <= now, 1)))
+        ).filter(getattr(Show, self._show_fk) == self.id).one()
+        return upcoming, past
+
+    def upcoming_shows(self, now=None):
+        now = now or datetime.now()
+        return self._shows_query().filter(
+            Show.start_time > now
+        ).order_by(Show.start_time, Show.id).all()
+
+    def past_shows(self, page=1, per_page=PAST_SHOWS_PER_PAGE, now=None):
+        """Return one page of past shows, most recent first."""
+        now = now or datetime.now()
+        page = max(page, 1)
+        return self._shows_query().filter(
+            Show.start_time <= now
+        ).order_by(Show.start_time.desc(), Show.id.desc()).offset(
+            (page - 1) * per_page).limit(per_page).all()
 
-class Venue(db.Model):
+    @classmethod
+    def last_modified(cls, owner_id, now=None):
+        """Return when the owner's detail page last changed, or ``None``.
+
+        That is the later of the row's ``updated_at`` and the start of its
+        most recent show, since a show starting moves it from upcoming to
+        past. Both come from one indexed round trip.
+        """
+        now = now or datetime.now()
+        last_started = db.session.query(func.max(Show.start_time)).filter(
+            getattr(Show, cls._show_fk) == owner_id,
+            Show.start_time <= now
+        ).scalar_subquery()
+        row = db.session.query(cls.updated_at, last_started).filter(
+            cls.id == owner_id).first()
+        if row is None:
+            return None
+        return max(value for value in row if value is not None)
+
+    @classmethod
+    def refresh_show_counts(cls, ids=None, now=None):
+        """Recompute the show counters of ``ids`` (or of every row).
+
+        One UPDATE with correlated subqueries over the ``(fk, start_time)``
+        index, run inside the caller's transaction so the counters commit
+        or roll back together with the shows that changed them.
+        """
+        now = now or datetime.now()
+        owned = getattr(Show, cls._show_fk) == cls.id
+        query = db.session.query(cls)
+        if ids is not None:
+            query = query.filter(cls.id.in_(ids))
+        return query.update({
+            cls.upcoming_show_count: select(func.count(Show.id)).where(
+                owned, Show.start_time > now).scalar_subquery(),
+            cls.past_show_count: select(func.count(Show.id)).where(
+                owned, Show.start_time <= now).scalar_subquery(),
+            cls.next_show_at: select(func.min(Show.start_time)).where(
+                owned, Show.start_time > now).scalar_subquery(),
+        }, synchronize_session=False)
+
+    @classmethod
+    def roll_over(cls, now=None):
+        """Refresh the rows whose next show has started by ``now``."""
+        now = now or datetime.now()
+        return cls.refresh_show_counts(
+            select(cls.id).where(cls.next_show_at <= now), now)
+
+    @classmethod
+    def touch(cls, ids):
+        """Bump ``updated_at`` of rows whose pages render changed data."""
+        db.session.query(cls).filter(cls.id.in_(ids)).update(
+            {cls.updated_at: datetime.now()}, synchronize_session=False)
+
+
+class ThumbnailMixin:
+    """Result of verifying ``image_link``, filled in by images.py.
+
+    ``thumbnail`` names a resized copy in the thumbnail cache, and
+    ``image_error`` says why the remote image was rejected. Both stay
+    empty until the link is checked; changing the link clears them.
+    """
+    thumbnail = db.Column(db.String(80), nullable=True)
+    image_error = db.Column(db.String(200), nullable=True)
+    image_checked_at = db.Column(db.DateTime, nullable=True)
+
+
+class Venue(ShowScheduleMixin, ThumbnailMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False,
+                        index=True)
     address = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120), nullable=False)
     image_link = db.Column(db.String(500), nullable=False)
@@ -47,15 +178,26 @@ class Venue(db.Model):
     website = db.Column(db.String, nullable=False)
     genres = db.relationship(
         'Genre', secondary=venue_genres, backref='venue', lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now, server_default=func.now())
+
+    _show_fk = 'venue_id'
+    _show_counterpart = 'artist'
+
+    __table_args__ = (
+        db.Index('ix_venue_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
 
     def __repr__(self):
         return f'<Venue {self.name}>'
 
 
-class Artist(db.Model):
+class Artist(ShowScheduleMixin, ThumbnailMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
-    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('area.id'), nullable=False,
+                        index=True)
     phone = db.Column(db.String(120), nullable=False)
     image_link = db.Column(db.String(500), nullable=False)
     facebook_link = db.Column(db.String(120))
@@ -65,11 +207,130 @@ class Artist(db.Model):
     genres = db.relationship(
         'Genre', secondary=artist_genres, backref='artists', lazy=True)
     website = db.Column(db.String, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now, server_default=func.now())
+
+    _show_fk = 'artist_id'
+    _show_counterpart = 'venue'
+
+    __table_args__ = (
+        db.Index('ix_artist_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
+
+# GiST indexes over (fk, tsrange(start_time, end_time)) that migration
+# 5c3e9a7d2f18 creates on PostgreSQL only. Autogenerate cannot compare
+# them, so migrations/env.py leaves them out instead of dropping them.
+UNMANAGED_INDEXES = {'ix_show_venue_id_during', 'ix_show_artist_id_during'}
+
+
+def _default_end_time(context):
+    return (context.get_current_parameters()['start_time']
+            + DEFAULT_SHOW_DURATION)
 
 
 class Show(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False,
+                         default=_default_end_time)
     artist_id = db.Column(db.Integer, db.ForeignKey(
         'artist.id'), nullable=False)
     venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           onupdate=datetime.now, server_default=func.now())
+
+    # PostgreSQL also has the GiST range indexes in UNMANAGED_INDEXES.
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+    )
+
+    @staticmethod
+    def references_exist(artist_id, venue_id):
+        """Return ``(artist exists, venue exists)`` from one query."""
+        return db.session.execute(select(
+            exists().where(Artist.id == artist_id),
+            exists().where(Venue.id == venue_id)
+        )).one()
+
+    @classmethod
+    def overlapping(cls, venue_id, artist_id, start, end):
+        """Shows at the venue or with the artist overlapping ``[start, end)``.
+
+        PostgreSQL answers through the GiST range indexes from migration
+        ``5c3e9a7d2f18``; elsewhere the ``(venue_id, start_time)`` and
+        ``(artist_id, start_time)`` indexes are scanned over at most
+        ``MAX_SHOW_DURATION`` before ``start``.
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            during = func.tsrange(cls.start_time, cls.end_time).op('&&')(
+                func.tsrange(start, end))
+        else:
+            during = and_(cls.start_time < end, cls.end_time > start,
+                          cls.start_time > start - MAX_SHOW_DURATION)
+        return cls.query.filter(
+            or_(cls.venue_id == venue_id, cls.artist_id == artist_id), during
+        ).order_by(cls.start_time).all()
+
+    @classmethod
+    def keyset_page(cls, per_page, after=None, before=None):
+        """Return ``(shows, has_more)`` ordered by ``(start_time, id)``.
+
+        ``after`` and ``before`` are ``(start_time, id)`` cursors. Only the
+        artist and venue columns rendered by a show tile are loaded.
+        """
+        query = cls.query.options(
+            joinedload(cls.artist).load_only(
+                Artist.id, Artist.name, Artist.image_link, Artist.thumbnail,
+                Artist.image_error),
+            joinedload(cls.venue).load_only(Venue.id, Venue.name)
+        )
+        key = tuple_(cls.start_time, cls.id)
+        if before is not None:
+            query = query.filter(key < tuple_(*before)).order_by(
+                cls.start_time.desc(), cls.id.desc())
+        else:
+            if after is not None:
+                query = query.filter(key > tuple_(*after))
+            query = query.order_by(cls.start_time, cls.id)
+
+        shows = query.limit(per_page + 1).all()
+        has_more = len(shows) > per_page
+        shows = shows[:per_page]
+        if before is not None:
+            shows.reverse()
+        return shows, has_more
+
+
+class Job(db.Model):
+    """A unit of background work, run by ``flask worker`` (see jobs.py).
+
+    ``status`` moves from ``queued`` to ``running`` and then to ``done``,
+    back to ``queued`` with a later ``run_at`` when a retry is due, or to
+    ``failed`` once ``max_attempts`` is used up.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued',
+                       server_default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0,
+                         server_default='0')
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    locked_by = db.Column(db.String(120), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                           server_default=func.now())
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
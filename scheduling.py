@@ -0,0 +1,286 @@
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import click
+from flask import Flask, current_app
+from sqlalchemy import distinct, func, or_, select
+from sqlalchemy.orm import joinedload
+
+from cache import get_page_cache
+from jobs import job
+from models import (MAX_SHOW_DURATION, Area, Artist, Genre, Show, Venue, db,
+                    venue_genres)
+
+
+class IntervalTree:
+    """Static centred interval tree over half-open ``[start, end)`` ranges.
+
+    Each node keeps the intervals containing its centre, sorted by start
+    and by end; intervals wholly before or after the centre go to the left
+    and right subtrees. A query visits one root-to-leaf path plus the
+    nodes whose centre falls inside the query range, so looking up ``k``
+    overlaps among ``m`` intervals costs ``O(log m + k)``.
+    """
+
+    def __init__(self, intervals):
+        intervals = [interval for interval in intervals
+                     if interval[0] < interval[1]]
+        self.center = None
+        if not intervals:
+            return
+        starts = sorted(start for start, _, _ in intervals)
+        self.center = starts[len(starts) // 2]
+
+        before, after, here = [], [], []
+        for interval in intervals:
+            start, end, _ = interval
+            if end <= self.center:
+                before.append(interval)
+            elif start > self.center:
+                after.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1],
+                             reverse=True)
+        self.left = IntervalTree(before) if before else None
+        self.right = IntervalTree(after) if after else None
+
+    def overlapping(self, start, end):
+        """Yield the payloads of intervals overlapping ``[start, end)``."""
+        node = self
+        pending = []
+        while node is not None and node.center is not None:
+            if end <= node.center:
+                # Every interval here contains the centre, so it overlaps
+                # exactly when it starts before the query ends.
+                for interval in node.by_start:
+                    if interval[0] >= end:
+                        break
+                    yield interval[2]
+                node = node.left
+            elif start > node.center:
+                for interval in node.by_end:
+                    if interval[1] <= start:
+                        break
+                    yield interval[2]
+                node = node.right
+            else:
+                for interval in node.by_start:
+                    yield interval[2]
+                if node.right is not None:
+                    pending.append(node.right)
+                node = node.left
+            if node is None and pending:
+                node = pending.pop()
+
+
+_EMPTY = IntervalTree([])
+
+
+def split_conflicts(rows):
+    """Split new shows into ``(accepted, conflicting)`` for a bulk import.
+
+    Rows need ``venue_id``, ``artist_id``, ``start_time`` and ``end_time``.
+    Existing shows that could overlap the batch are fetched in one query
+    and indexed in one interval tree per venue and per artist. Rows are
+    then checked in start order, so a row only has to be compared with
+    the latest-ending accepted row of the same venue or artist to catch
+    clashes within the batch itself.
+    """
+    if not rows:
+        return [], []
+    venue_ids = {row['venue_id'] for row in rows}
+    artist_ids = {row['artist_id'] for row in rows}
+    earliest = min(row['start_time'] for row in rows)
+    latest = max(row['end_time'] for row in rows)
+    existing = db.session.execute(
+        select(Show.id, Show.venue_id, Show.artist_id, Show.start_time,
+               Show.end_time).where(
+            or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)),
+            Show.start_time < latest,
+            Show.start_time > earliest - MAX_SHOW_DURATION,
+            Show.end_time > earliest))
+
+    by_venue, by_artist = defaultdict(list), defaultdict(list)
+    for show_id, venue_id, artist_id, start, end in existing:
+        if venue_id in venue_ids:
+            by_venue[venue_id].append((start, end, show_id))
+        if artist_id in artist_ids:
+            by_artist[artist_id].append((start, end, show_id))
+    venue_trees = {key: IntervalTree(value) for key, value in by_venue.items()}
+    artist_trees = {key: IntervalTree(value)
+                    for key, value in by_artist.items()}
+
+    accepted, conflicting = [], []
+    venue_busy_until, artist_busy_until = {}, {}
+    for row in sorted(rows, key=lambda row: row['start_time']):
+        start, end = row['start_time'], row['end_time']
+        venue_id, artist_id = row['venue_id'], row['artist_id']
+        clash = (
+            venue_busy_until.get(venue_id, start) > start
+            or artist_busy_until.get(artist_id, start) > start
+            or any(True for _ in venue_trees.get(
+                venue_id, _EMPTY).overlapping(start, end))
+            or any(True for _ in artist_trees.get(
+                artist_id, _EMPTY).overlapping(start, end)))
+        if clash:
+            conflicting.append(row)
+            continue
+        accepted.append(row)
+        venue_busy_until[venue_id] = max(
+            venue_busy_until.get(venue_id, end), end)
+        artist_busy_until[artist_id] = max(
+            artist_busy_until.get(artist_id, end), end)
+    return accepted, conflicting
+
+
+
+def show_filters(start=None, end=None, city=None, state=None, genre=None):
+    """WHERE clauses restricting shows by date range, area and genre.
+
+    Area and genre resolve to the matching venue ids in a subquery joining
+    ``venue``, ``area`` and ``venue_genres``, so the outer query can still
+    use the ``(venue_id, start_time)`` and ``(start_time, id)`` indexes.
+    A city without a state matches that city in every state.
+    """
+    clauses = []
+    if start is not None:
+        clauses.append(Show.start_time >= start)
+    if end is not None:
+        clauses.append(Show.start_time < end)
+    if city or state or genre:
+        venues = select(Venue.id)
+        if city or state:
+            venues = venues.join(Area, Venue.area_id == Area.id)
+        if city:
+            venues = venues.where(Area.city == city)
+        if state:
+            venues = venues.where(Area.state == state)
+        if genre:
+            venues = venues.join(
+                venue_genres, venue_genres.c.venue_id == Venue.id
+            ).join(Genre, Genre.id == venue_genres.c.genre_id).where(
+                Genre.name == genre)
+        clauses.append(Show.venue_id.in_(venues))
+    return clauses
+
+
+def _as_date(value):
+    # SQLite's date() returns text, PostgreSQL's a date.
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def daily_totals(clauses):
+    """Return ``{day: (shows, venues, artists)}`` aggregated in SQL."""
+    day = func.date(Show.start_time)
+    rows = db.session.execute(
+        select(day, func.count(Show.id),
+               func.count(distinct(Show.venue_id)),
+               func.count(distinct(Show.artist_id))
+               ).where(*clauses).group_by(day).order_by(day))
+    return {_as_date(day): (shows, venues, artists)
+            for day, shows, venues, artists in rows}
+
+
+def month_calendar(year, month, city=None, state=None, genre=None):
+    """Per-day totals of one month, cached until any show page changes.
+
+    The totals are stored in the page cache backend under the ``shows``
+    tag, which every show, venue and artist mutation already invalidates.
+    """
+    page_cache = get_page_cache()
+    key = page_cache.data_key('shows', 'calendar', year, month, city, state,
+                              genre)
+    cached_totals = page_cache.backend.get(key)
+    if cached_totals is not None:
+        return {date.fromisoformat(day): tuple(totals)
+                for day, totals in json.loads(cached_totals).items()}
+
+    first = datetime(year, month, 1)
+    following = (first + timedelta(days=31)).replace(day=1)
+    totals = daily_totals(show_filters(first, following, city, state, genre))
+    page_cache.backend.set(
+        key, json.dumps({day.isoformat(): value
+                         for day, value in totals.items()}),
+        current_app.config['CALENDAR_CACHE_TTL'])
+    return totals
+
+
+def shows_between(clauses, limit):
+    """The first ``limit`` matching shows with the tile columns loaded."""
+    return Show.query.options(
+        joinedload(Show.artist).load_only(
+            Artist.id, Artist.name, Artist.image_link, Artist.thumbnail,
+            Artist.image_error),
+        joinedload(Show.venue).load_only(Venue.id, Venue.name)
+    ).filter(*clauses).order_by(Show.start_time, Show.id).limit(limit).all()
+
+
+def _in_calendar(day):
+    # Month navigation and inclusive ranges step a day or a month past the
+    # requested dates, which must stay inside what ``date`` can represent.
+    if not date.min.year < day.year < date.max.year:
+        raise ValueError(f'Year {day.year} is out of range')
+    return day
+
+
+def parse_calendar_args(args):
+    """Read calendar filters from query arguments into ``show_filters`` kwargs.
+
+    ``from`` and ``to`` are inclusive ISO dates; a malformed date, or one
+    in the first or last year ``date`` supports, raises ``ValueError``.
+    """
+    start = (_in_calendar(date.fromisoformat(args['from']))
+             if args.get('from') else None)
+    end = (_in_calendar(date.fromisoformat(args['to']))
+           if args.get('to') else None)
+    return {
+        'start': datetime.combine(start, datetime.min.time()) if start
+        else None,
+        'end': datetime.combine(end + timedelta(days=1), datetime.min.time())
+        if end else None,
+        'city': args.get('city', '').strip() or None,
+        'state': args.get('state', '').strip().upper() or None,
+        'genre': args.get('genre', '').strip() or None,
+    }
+
+
+def parse_month(value):
+    """Turn ``YYYY-MM`` into ``(year, month)``; raises ``ValueError``."""
+    parsed = _in_calendar(datetime.strptime(value, '%Y-%m'))
+    return parsed.year, parsed.month
+
+
+@job('roll-over-shows')
+def roll_over_shows(now=None):
+    """Move started shows from upcoming to past on every venue and artist.
+
+    Only rows whose ``next_show_at`` has passed are recomputed, through the
+    ``next_show_at`` indexes. Returns ``(venues, artists)`` updated.
+    """
+    now = now or datetime.now()
+    venues = Venue.roll_over(now)
+    artists = Artist.roll_over(now)
+    db.session.commit()
+    if venues or artists:
+        get_page_cache().invalidate('venues', 'artists')
+    return venues, artists
+
+
+def register_schedule_commands(app: Flask) -> None:
+
+    @app.cli.command('roll-over-shows')
+    @click.option('--full', is_flag=True,
+                  help='Recompute every counter instead of only stale ones.')
+    def roll_over_command(full):
+        """Refresh upcoming/past show counters; run it from cron."""
+        if full:
+            venues = Venue.refresh_show_counts()
+            artists = Artist.refresh_show_counts()
+            db.session.commit()
+            get_page_cache().invalidate('venues', 'artists')
+        else:
+            venues, artists = roll_over_shows()
+        click.echo(f'Refreshed {venues} venues and {artists} artists')
@@ -0,0 +1,133 @@
+import heapq
+
+from flask import Flask, current_app
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import contains_eager
+
+from models import Artist, Show, Venue, db
+
+
+def escape_like(term):
+    """Escape LIKE wildcards in ``term``; use with ``escape='\\'``."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _like_pattern(term):
+    return f'%{escape_like(term)}%'
+
+
+class PostgresSearch:
+    """Ranked search on PostgreSQL backed by pg_trgm GIN indexes.
+
+    ``ILIKE '%term%'`` is served by the ``gin_trgm_ops`` indexes created in
+    migration ``d3a1f0c2b7e4`` and results are ordered by trigram similarity.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def _search_names(self, model, term):
+        return model.query.filter(
+            model.name.ilike(_like_pattern(term), escape='\\')
+        ).order_by(
+            func.similarity(model.name, term).desc(), model.id
+        ).limit(self.limit).all()
+
+    def search_venues(self, term):
+        return self._search_names(Venue, term)
+
+    def search_artists(self, term):
+        return self._search_names(Artist, term)
+
+    def search_shows(self, term):
+        pattern = _like_pattern(term)
+        # Resolve the matching artists and venues through their own trigram
+        # indexes first, then fetch the shows by foreign key.
+        artist_ids = select(Artist.id).where(
+            Artist.name.ilike(pattern, escape='\\'))
+        venue_ids = select(Venue.id).where(
+            Venue.name.ilike(pattern, escape='\\'))
+        return Show.query.join(Show.artist).join(Show.venue).filter(
+            or_(Show.artist_id.in_(artist_ids), Show.venue_id.in_(venue_ids))
+        ).options(
+            contains_eager(Show.artist), contains_eager(Show.venue)
+        ).order_by(
+            func.greatest(func.similarity(Artist.name, term),
+                          func.similarity(Venue.name, term)).desc(),
+            Show.start_time.desc(), Show.id
+        ).limit(self.limit).all()
+
+
+class MemorySearch:
+    """Portable fallback that ranks substring matches in Python.
+
+    Only ``(id, name)`` pairs are pulled from the database; the best
+    ``limit`` matches are then loaded as full objects.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    @staticmethod
+    def _rank(name, term):
+        lowered = name.lower()
+        position = lowered.find(term)
+        return (lowered != term, position != 0, position, len(name))
+
+    def _top_ids(self, rows, term):
+        term = term.lower()
+        best = heapq.nsmallest(
+            self.limit, rows,
+            key=lambda row: (self._rank(row[1], term), row[0]))
+        return [row[0] for row in best]
+
+    def _search_names(self, model, term):
+        rows = db.session.query(model.id, model.name).filter(
+            model.name.ilike(_like_pattern(term), escape='\\')).all()
+        ids = self._top_ids(rows, term)
+        found = {obj.id: obj for obj in model.query.filter(model.id.in_(ids))}
+        return [found[obj_id] for obj_id in ids]
+
+    def search_venues(self, term):
+        return self._search_names(Venue, term)
+
+    def search_artists(self, term):
+        return self._search_names(Artist, term)
+
+    def search_shows(self, term):
+        pattern = _like_pattern(term)
+        rows = db.session.query(
+            Show.id, Artist.name, Venue.name
+        ).join(Show.artist).join(Show.venue).filter(
+            or_(Artist.name.ilike(pattern, escape='\\'),
+                Venue.name.ilike(pattern, escape='\\'))
+        ).all()
+        term = term.lower()
+        best = heapq.nsmallest(
+            self.limit, rows,
+            key=lambda row: (min(self._rank(row[1], term),
+                                 self._rank(row[2], term)), row[0]))
+        ids = [row[0] for row in best]
+        query = Show.query.join(Show.artist).join(Show.venue).options(
+            contains_eager(Show.artist), contains_eager(Show.venue))
+        found = {show.id: show for show in query.filter(Show.id.in_(ids))}
+        return [found[show_id] for show_id in ids]
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'memory': MemorySearch,
+}
+
+
+def init_search(app: Flask) -> None:
+    """Pick the search backend from ``SEARCH_BACKEND`` or the database URL."""
+    name = app.config.get('SEARCH_BACKEND') or make_url(
+        app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    backend = BACKENDS.get(name, MemorySearch)
+    app.extensions['search'] = backend(app.config['SEARCH_RESULTS_LIMIT'])
+
+
+def get_search():
+    return current_app.extensions['search']
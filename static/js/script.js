@@ -2,3 +2,80 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Typeahead for search boxes marked with data-suggest="venue|artist".
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('input[data-suggest]').forEach(function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var timer = null;
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      var q = input.value.trim();
+      if (!q) {
+        list.innerHTML = '';
+        return;
+      }
+      timer = setTimeout(function () {
+        var url = '/api/suggest?kind=' + input.dataset.suggest +
+          '&q=' + encodeURIComponent(q);
+        fetch(url).then(function (response) {
+          return response.json();
+        }).then(function (body) {
+          list.innerHTML = '';
+          body.data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.name;
+            list.appendChild(option);
+          });
+        });
+      }, 150);
+    });
+  });
+});
+
+// Artist/venue pickers on the new show form. Each page of matches comes
+// from /api/v1/<kind>?q=...; "More" follows the page's next link.
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('[data-picker]').forEach(function (picker) {
+    var search = picker.querySelector('[data-picker-search]');
+    var results = picker.querySelector('[data-picker-results]');
+    var more = picker.querySelector('[data-picker-more]');
+    var idInput = picker.querySelector('input[type="number"]');
+    var next = null;
+    var timer = null;
+
+    function load(url, append) {
+      fetch(url).then(function (response) {
+        return response.json();
+      }).then(function (body) {
+        if (!append) {
+          results.innerHTML = '';
+        }
+        body.data.forEach(function (item) {
+          var option = document.createElement('option');
+          option.value = item.id;
+          option.textContent = item.name + ' (#' + item.id + ')';
+          results.appendChild(option);
+        });
+        next = body.next;
+        more.hidden = !next;
+      });
+    }
+
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        load('/api/v1/' + picker.dataset.picker + '?fields=id,name&limit=20&q=' +
+          encodeURIComponent(search.value.trim()), false);
+      }, 150);
+    });
+    results.addEventListener('change', function () {
+      idInput.value = results.value;
+    });
+    more.addEventListener('click', function () {
+      if (next) {
+        load(next, true);
+      }
+    });
+  });
+});
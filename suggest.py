@@ -0,0 +1,236 @@
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left, insort
+
+from flask import Flask, current_app, has_app_context
+from sqlalchemy import event, literal, select, union_all
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Artist, Venue, db
+from search import escape_like
+
+SUGGEST_MODELS = {'venue': Venue, 'artist': Artist}
+
+
+def _words(name):
+    """Yield every suffix of ``name`` that starts a word, casefolded.
+
+    Indexing "The Velvet Room" under "the velvet room", "velvet room" and
+    "room" lets a prefix match any word, not just the first.
+    """
+    folded = name.casefold()
+    start = 0
+    for word in folded.split():
+        start = folded.index(word, start)
+        yield folded[start:]
+        start += len(word)
+
+
+def _entry_size(entry):
+    return sys.getsizeof(entry) + sum(sys.getsizeof(part) for part in entry)
+
+
+class PrefixIndex:
+    """Sorted array of ``(word suffix, name, kind, id)`` entries.
+
+    A lookup bisects to the first entry at or after the prefix and scans
+    forward while entries still start with it. A background thread
+    builds the index when the app starts and rebuilds it every
+    ``max_age`` seconds, so changes made by other worker processes (or by
+    ``flask import-data``) show up eventually; changes committed in this
+    process are applied immediately. Lookups keep using the previous
+    entries while a rebuild runs, and go to the database until the first
+    build finishes. If the entries would outgrow ``budget`` bytes the
+    index is dropped and lookups go to the database until the next
+    rebuild.
+    """
+
+    def __init__(self, budget, max_age):
+        self.budget = budget
+        self.max_age = max_age
+        self.fits = False
+        self._entries = []
+        self._names = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._refresher = None
+
+    def start(self, app):
+        """Start the refresh thread unless one is running in this process.
+
+        Threads do not survive a fork, so a pre-forked worker starts its
+        own on its first lookup.
+        """
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh, args=(weakref.ref(app),),
+                name='suggest-index', daemon=True)
+            self._refresher.start()
+
+    def _refresh(self, app_ref):
+        while True:
+            app = app_ref()
+            if app is None:
+                return
+            with app.app_context():
+                try:
+                    self.build()
+                except SQLAlchemyError:
+                    app.logger.exception('Could not build the suggest index')
+                finally:
+                    db.session.remove()
+            del app
+            time.sleep(self.max_age)
+
+    def _add(self, kind, obj_id, name):
+        self._names[kind, obj_id] = name
+        for word in _words(name):
+            entry = (word, name, kind, obj_id)
+            insort(self._entries, entry)
+            self._size += _entry_size(entry)
+
+    def _remove(self, kind, obj_id):
+        name = self._names.pop((kind, obj_id), None)
+        if name is None:
+            return
+        for word in _words(name):
+            entry = (word, name, kind, obj_id)
+            position = bisect_left(self._entries, entry)
+            if (position < len(self._entries)
+                    and self._entries[position] == entry):
+                del self._entries[position]
+                self._size -= _entry_size(entry)
+
+    def _drop(self):
+        self._entries, self._names, self._size = [], {}, 0
+        self.fits = False
+
+    def build(self):
+        """Reload every venue and artist name unless a build is running."""
+        if not self._build_lock.acquire(blocking=False):
+            return
+        try:
+            self._build()
+        finally:
+            self._build_lock.release()
+
+    def _build(self):
+        rows = db.session.execute(union_all(*(
+            select(model.id, model.name).add_columns(
+                literal(kind).label('kind'))
+            for kind, model in SUGGEST_MODELS.items())))
+        entries, names, size = [], {}, 0
+        for obj_id, name, kind in rows:
+            names[kind, obj_id] = name
+            for word in _words(name):
+                entry = (word, name, kind, obj_id)
+                entries.append(entry)
+                size += _entry_size(entry)
+            if size > self.budget:
+                current_app.logger.warning(
+                    'Suggest index exceeds its %d byte budget; falling back '
+                    'to database lookups', self.budget)
+                with self._lock:
+                    self._drop()
+                return
+        entries.sort()
+        with self._lock:
+            self._entries, self._names, self._size = entries, names, size
+            self.fits = True
+
+    def apply(self, changes):
+        """Apply committed ``(kind, id, name or None)`` changes."""
+        with self._lock:
+            if not self.fits:
+                return
+            for kind, obj_id, name in changes:
+                self._remove(kind, obj_id)
+                if name is not None:
+                    self._add(kind, obj_id, name)
+            if self._size > self.budget:
+                self._drop()
+
+    def lookup(self, prefix, limit, kinds=tuple(SUGGEST_MODELS)):
+        prefix = prefix.casefold()
+        results, seen = [], set()
+        with self._lock:
+            entries = self._entries
+            position = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(results) < limit:
+                word, name, kind, obj_id = entries[position]
+                if not word.startswith(prefix):
+                    break
+                position += 1
+                if kind in kinds and (kind, obj_id) not in seen:
+                    seen.add((kind, obj_id))
+                    results.append({'kind': kind, 'id': obj_id, 'name': name})
+        return results
+
+
+def _database_lookup(prefix, limit, kinds):
+    stmt = union_all(*(
+        select(model.id, model.name).add_columns(
+            literal(kind).label('kind')
+        ).where(model.name.ilike(f'{escape_like(prefix)}%', escape='\\'))
+        for kind, model in SUGGEST_MODELS.items() if kind in kinds)
+    ).order_by('name', 'kind', 'id').limit(limit)
+    return [{'kind': kind, 'id': obj_id, 'name': name}
+            for obj_id, name, kind in db.session.execute(stmt)]
+
+
+def suggest(prefix, limit, kinds=tuple(SUGGEST_MODELS)):
+    """Return ``(suggestions, source)`` for a typeahead prefix.
+
+    ``kinds`` restricts the results to venues or artists. The database
+    fallback only matches the start of the whole name.
+    """
+    index = get_suggest_index()
+    index.start(current_app._get_current_object())
+    if index.fits:
+        return index.lookup(prefix, limit, kinds), 'index'
+    return _database_lookup(prefix, limit, kinds), 'database'
+
+
+def _pending(session):
+    return session.info.setdefault('suggest_pending', [])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    for kind, model in SUGGEST_MODELS.items():
+        for obj in session.new | session.dirty:
+            if isinstance(obj, model):
+                _pending(session).append((kind, obj.id, obj.name))
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                _pending(session).append((kind, obj.id, None))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_changes(session):
+    changes = session.info.pop('suggest_pending', [])
+    if changes and has_app_context() and 'suggest' in current_app.extensions:
+        get_suggest_index().apply(changes)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('suggest_pending', None)
+
+
+def init_suggest(app: Flask) -> None:
+    index = PrefixIndex(
+        app.config['SUGGEST_MEMORY_BUDGET'], app.config['SUGGEST_MAX_AGE'])
+    app.extensions['suggest'] = index
+    # Tests create their tables after the app; the first lookup starts it.
+    if not app.testing:
+        index.start(app)
+
+
+def get_suggest_index():
+    return current_app.extensions['suggest']
@@ -0,0 +1,105 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from app import create_app  # noqa: E402
+from models import Area, Artist, Genre, Show, Venue, db  # noqa: E402
+from utils import area_cache, genre_cache  # noqa: E402
+
+
+def make_config(**overrides):
+    settings = {name: getattr(config, name) for name in dir(config)
+                if name.isupper()}
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(make_config(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "fyyur.db"}',
+        TESTING=True, WTF_CSRF_ENABLED=False,
+        IMAGE_CACHE_DIR=str(tmp_path / 'thumbnails')))
+    with app.app_context():
+        db.create_all()
+    # Lookup caches are per process; ids from another test's database
+    # must not leak into this one.
+    area_cache.clear()
+    genre_cache.clear()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Return a callable reporting the statements run by one request.
+
+    Statements are counted until the response body has been consumed,
+    so streamed pages are measured in full.
+    """
+    with app.app_context():
+        engine = db.engine
+    counted = []
+
+    def count(statement, *args):
+        counted.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count)
+
+    def run(client, *args, **kwargs):
+        del counted[:]
+        response = client.get(*args, **kwargs)
+        response.get_data()
+        return response, len(counted)
+
+    yield run
+    event.remove(engine, 'before_cursor_execute', count)
+
+
+@pytest.fixture
+def sample_data(app):
+    """Three areas with venues and artists, genres and shows."""
+    now = datetime.now()
+    with app.app_context():
+        jazz, blues = Genre(name='Jazz'), Genre(name='Blues')
+        areas = [Area(city=city, state=state) for city, state in
+                 (('Austin', 'TX'), ('Boston', 'MA'), ('Chicago', 'IL'))]
+        venues, artists = [], []
+        for number, area in enumerate(areas * 2):
+            venues.append(Venue(
+                name=f'Venue {number}', area=area, address=f'{number} Main',
+                phone='123-123-1234', image_link='http://example.com/v.png',
+                facebook_link='http://facebook.com/v',
+                website='http://example.com', genres=[jazz]))
+            artists.append(Artist(
+                name=f'Artist {number}', area=area, phone='123-123-1234',
+                image_link='http://example.com/a.png', genres=[jazz, blues]))
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        for number, (venue, artist) in enumerate(zip(venues, artists)):
+            for offset in (-30, -20, -10, 10, 20):
+                db.session.add(Show(
+                    venue=venue, artist=artists[(number + 1) % len(artists)]
+                    if offset < 0 else artist,
+                    start_time=now + timedelta(days=offset, hours=number)))
+        db.session.flush()
+        Venue.refresh_show_counts(now=now)
+        Artist.refresh_show_counts(now=now)
+        db.session.commit()
+        return SimpleNamespace(venue_ids=[venue.id for venue in venues],
+                               artist_ids=[artist.id for artist in artists])
@@ -0,0 +1,24 @@
+import gc
+
+import app as app_module
+from app import create_app
+
+from conftest import make_config
+
+
+def test_one_fork_handler_for_every_app(tmp_path, monkeypatch):
+    handlers = []
+    monkeypatch.setattr(app_module.os, 'register_at_fork',
+                        lambda **kwargs: handlers.append(kwargs))
+    monkeypatch.setattr(app_module, '_fork_handler_registered', False)
+    monkeypatch.setattr(app_module, '_FORK_APPS', app_module.weakref.WeakSet())
+
+    apps = [create_app(make_config(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / f"{n}.db"}',
+        TESTING=True)) for n in range(3)]
+    assert handlers == [{'after_in_child': app_module._dispose_forked_engines}]
+    assert len(app_module._FORK_APPS) == 3
+
+    del apps
+    gc.collect()
+    assert len(app_module._FORK_APPS) == 0
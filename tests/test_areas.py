@@ -0,0 +1,51 @@
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+from models import Area, Artist, Venue, db
+from utils import area_cache, get_or_create_area
+
+THREADS = 8
+
+
+def test_concurrent_writers_share_one_area(app):
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def create(number):
+        with app.app_context():
+            barrier.wait()
+            try:
+                area = get_or_create_area('Austin', 'TX', db)
+                if number % 2:
+                    db.session.add(Venue(
+                        name=f'Venue {number}', area_id=area.id,
+                        address='1 Main', phone='123-123-1234',
+                        image_link='http://example.com/v.png',
+                        facebook_link='http://facebook.com/v',
+                        website='http://example.com'))
+                else:
+                    db.session.add(Artist(
+                        name=f'Artist {number}', area_id=area.id,
+                        phone='123-123-1234',
+                        image_link='http://example.com/a.png'))
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                errors.append(e)
+
+    area_cache.clear()
+    threads = [threading.Thread(target=create, args=(number,))
+               for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with app.app_context():
+        areas = Area.query.filter_by(city='Austin', state='TX').all()
+        assert len(areas) == 1
+        for model in (Venue, Artist):
+            owned = model.query.filter_by(area_id=areas[0].id).count()
+            assert owned == THREADS // 2
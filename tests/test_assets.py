@@ -0,0 +1,31 @@
+import re
+from urllib.parse import urljoin
+
+import assets
+from assets import build_assets, minify_css
+
+
+def test_minify_css_keeps_string_literals():
+    css = 'a > b , c { content: "x , y > z ;}" ; font-family: \'A  B\' ; }'
+    assert minify_css(css) == (
+        'a>b,c{content: "x , y > z ;}";font-family: \'A  B\'}')
+
+
+def test_bundled_css_links_resolve_under_assets(tmp_path, monkeypatch):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'fonts').mkdir()
+    (tmp_path / 'fonts' / 'icons.woff').write_bytes(b'wOFF')
+    (tmp_path / 'css' / 'site.css').write_text(
+        '@font-face { src: url("../fonts/icons.woff?#iefix"),'
+        ' url(../fonts/missing.ttf); }')
+    monkeypatch.setattr(assets, 'BUNDLES', {'css/app.css': ['css/site.css']})
+
+    manifest = build_assets(str(tmp_path))
+    bundle = (tmp_path / 'build' / manifest['css/app.css']).read_text()
+    links = re.findall(r'url\("?([^")?]+)([^")]*)"?\)', bundle)
+    served = f'http://fyyur.test/assets/{manifest["css/app.css"]}'
+    assert [(urljoin(served, link), suffix) for link, suffix in links] == [
+        (f'http://fyyur.test/assets/{manifest["fonts/icons.woff"]}',
+         '?#iefix'),
+        ('http://fyyur.test/static/fonts/missing.ttf', ''),
+    ]
@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', 30),
+    ('?city=Austin', 10),
+    ('?state=MA', 10),
+    ('?city=Austin&state=TX', 10),
+    ('?city=Austin&state=MA', 0),
+])
+def test_show_filters_by_area(client, sample_data, query, expected):
+    response = client.get(f'/api/v1/shows{query}')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == expected
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/calendar?month=9999-12',
+    '/api/v1/calendar?month=0001-01',
+    '/api/v1/calendar?from=2026-01-01&to=9999-12-31',
+    '/api/v1/shows?from=0001-01-01&to=9999-12-31',
+])
+def test_api_rejects_dates_at_the_calendar_edges(client, url):
+    assert client.get(url).status_code == 400
+
+
+@pytest.mark.parametrize('query', [
+    'month=0001-01',
+    'month=9999-12',
+    'from=2026-01-01&to=9999-12-31',
+])
+def test_calendar_page_rejects_dates_at_the_calendar_edges(client, query):
+    response = client.get(f'/shows/calendar?{query}')
+    assert response.status_code == 302
+    assert response.location.endswith('/shows/calendar')
+
+
+def test_calendar_accepts_far_dates(client):
+    assert client.get('/api/v1/calendar?month=9998-12').status_code == 200
+    assert client.get('/shows/calendar?month=0002-01').status_code == 200
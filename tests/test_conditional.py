@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as app_module
+import models
+from models import Artist, Venue, db
+
+VENUE_FORM = {
+    'name': 'Venue 0', 'city': 'Austin', 'state': 'TX',
+    'address': '0 Main', 'phone': '123-123-1234',
+    'image_link': 'http://example.com/v.png',
+    'facebook_link': 'http://facebook.com/v',
+    'website_link': 'http://example.com',
+}
+ARTIST_FORM = {
+    'name': 'Artist 0', 'city': 'Austin', 'state': 'TX',
+    'phone': '123-123-1234', 'image_link': 'http://example.com/a.png',
+    'facebook_link': 'http://facebook.com/a',
+}
+
+
+@pytest.mark.parametrize('kind, model, form', [
+    ('venues', Venue, VENUE_FORM),
+    ('artists', Artist, ARTIST_FORM),
+])
+def test_genre_only_edit_changes_etag(app, client, sample_data, kind,
+                                      model, form):
+    owner_id = getattr(sample_data, f'{kind[:-1]}_ids')[0]
+    url = f'/{kind}/{owner_id}'
+    # Save the form unchanged first, so only the genres differ below.
+    client.post(f'{url}/edit', data={**form, 'genres': ['Jazz']})
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    response = client.post(f'{url}/edit',
+                           data={**form, 'genres': ['Blues']})
+    assert response.status_code == 200
+    with app.app_context():
+        owner = db.session.get(model, owner_id)
+        assert [genre.name for genre in owner.genres] == ['Blues']
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_started_show_changes_cached_page(app, client, sample_data,
+                                          monkeypatch):
+    url = f'/venues/{sample_data.venue_ids[0]}'
+    first = client.get(url)
+    assert '2 Upcoming Shows' in first.get_data(as_text=True)
+
+    # The next show of the first venue starts ten days from now.
+    later = datetime.now() + timedelta(days=15)
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return later
+
+    monkeypatch.setattr(app_module, 'datetime', Later)
+    monkeypatch.setattr(models, 'datetime', Later)
+    second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert '1 Upcoming Show' in second.get_data(as_text=True)
@@ -0,0 +1,150 @@
+import asyncio
+import io
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import update
+
+import images
+from images import (ImageError, _check_links, fetch, thumbnail_path,
+                    verify_images)
+from models import Venue, db
+
+PUBLIC_ADDRESS = '93.184.215.14'
+
+
+class FakeWriter:
+
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Answer every connection with the next canned response."""
+    responses, connected = [], []
+
+    async def getaddrinfo(self, host, port, **kwargs):
+        address = host if host[0].isdigit() or ':' in host else PUBLIC_ADDRESS
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port))]
+
+    async def open_connection(host, port, **kwargs):
+        connected.append(host)
+        reader = asyncio.StreamReader()
+        reader.feed_data(responses.pop(0))
+        reader.feed_eof()
+        return reader, FakeWriter()
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, 'getaddrinfo', getaddrinfo)
+    monkeypatch.setattr(images.asyncio, 'open_connection', open_connection)
+    return responses, connected
+
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1:8765/x.png',
+    'http://[::1]/x.png',
+    'http://10.1.2.3/x.png',
+    'http://169.254.169.254/latest/meta-data',
+    'http://[::ffff:192.168.0.1]/x.png',
+])
+def test_private_addresses_are_not_fetched(connections, url):
+    with pytest.raises(ImageError, match='public address'):
+        asyncio.run(fetch(url, 1024))
+    assert connections[1] == []
+
+
+def test_redirects_are_checked_on_every_hop(connections):
+    responses, connected = connections
+    responses.append(b'HTTP/1.1 302 Found\r\n'
+                     b'Location: http://127.0.0.1:8765/admin\r\n\r\n')
+    with pytest.raises(ImageError, match='public address'):
+        asyncio.run(fetch('http://images.example.com/x.png', 1024))
+    assert connected == [PUBLIC_ADDRESS]
+
+
+def test_connection_errors_are_stored_generically(app, monkeypatch):
+    async def getaddrinfo(self, host, port, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '',
+                 (PUBLIC_ADDRESS, port))]
+
+    async def refuse(host, port, **kwargs):
+        raise ConnectionRefusedError(f'Connect call failed ({host!r}, {port})')
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, 'getaddrinfo', getaddrinfo)
+    monkeypatch.setattr(images.asyncio, 'open_connection', refuse)
+    url = 'http://images.example.com:8080/x.png'
+    results = asyncio.run(_check_links([url], app.config))
+    assert results == {url: (None, 'Image link could not be fetched')}
+
+
+@pytest.fixture
+def image_server(monkeypatch):
+    """Serve a real PNG from a loopback HTTP server and allow loopback."""
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new('RGB', (1200, 800), 'purple').save(output, 'PNG')
+    body = output.getvalue()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    async def resolve_loopback(host, port):
+        return '127.0.0.1'
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(images, '_resolve_public', resolve_loopback)
+    yield f'http://localhost:{server.server_address[1]}/venue.png'
+    server.shutdown()
+    server.server_close()
+
+
+def test_verified_image_is_thumbnailed_and_served(app, client, sample_data,
+                                                  image_server):
+    from PIL import Image
+
+    venue_id = sample_data.venue_ids[0]
+    with app.app_context():
+        db.session.execute(update(Venue).where(Venue.id == venue_id)
+                           .values(image_link=image_server))
+        db.session.commit()
+        results = verify_images(urls=[image_server])
+        name, error = results[image_server]
+        assert error is None
+        venue = db.session.get(Venue, venue_id)
+        assert venue.thumbnail == name
+        assert venue.image_error is None
+        assert venue.image_checked_at is not None
+
+    path = thumbnail_path(app.config['IMAGE_CACHE_DIR'], name)
+    assert os.path.exists(path)
+    with Image.open(path) as thumbnail:
+        assert thumbnail.format == app.config['IMAGE_THUMBNAIL_FORMAT']
+        assert thumbnail.size == (600, 400)
+
+    response = client.get(f'/thumbnails/{name}')
+    assert response.status_code == 200
+    with open(path, 'rb') as stored:
+        assert response.data == stored.read()
+    assert response.cache_control.public
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age > 0
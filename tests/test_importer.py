@@ -0,0 +1,42 @@
+import io
+from datetime import datetime, timezone
+
+from importer import read_rows, run_import
+from models import Show, db
+
+
+def run(kind, text):
+    messages = []
+    result = run_import(kind, read_rows(io.StringIO(text), 'jsonl'), 100,
+                        echo=lambda message, err=False: messages.append(
+                            message))
+    return result, messages
+
+
+def test_malformed_lines_are_rejected_individually(app, sample_data):
+    venue_id, artist_id = sample_data.venue_ids[0], sample_data.artist_ids[0]
+    text = '\n'.join([
+        '{"artist_id": %d, "venue_id": %d,' % (artist_id, venue_id),
+        '[1, 2]',
+        '{"artist_id": %d, "venue_id": %d, "start_time": "2031-05-01T20:00"}'
+        % (artist_id, venue_id),
+    ])
+    with app.app_context():
+        (imported, rejected), messages = run('shows', text)
+    assert (imported, rejected) == (1, 2)
+    assert messages[0].startswith('row 1: not valid JSON')
+    assert messages[1] == 'row 2: not a JSON object'
+
+
+def test_aware_start_times_are_stored_as_local_time(app, sample_data):
+    venue_id, artist_id = sample_data.venue_ids[0], sample_data.artist_ids[0]
+    start = datetime(2031, 5, 1, 18, 0, tzinfo=timezone.utc)
+    text = ('{"artist_id": %d, "venue_id": %d, "start_time": "%s"}\n'
+            % (artist_id, venue_id, start.isoformat()))
+    with app.app_context():
+        (imported, rejected), _ = run('shows', text)
+        assert (imported, rejected) == (1, 0)
+        stored = db.session.scalars(
+            db.select(Show.start_time).where(Show.venue_id == venue_id)
+            .order_by(Show.id.desc())).first()
+    assert stored == start.astimezone().replace(tzinfo=None)
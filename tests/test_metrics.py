@@ -0,0 +1,40 @@
+import re
+import threading
+
+from metrics import Counter, Histogram
+
+
+def test_exited_threads_fold_their_shards():
+    counter, histogram = Counter(), Histogram()
+
+    def record():
+        counter.inc(('venues',))
+        histogram.observe(('venues',), 0.003)
+
+    for _ in range(500):
+        thread = threading.Thread(target=record)
+        thread.start()
+        thread.join()
+    record()
+
+    assert len(counter._shards) <= 2
+    assert len(histogram._shards) <= 2
+    assert counter.collect() == {('venues',): 501}
+    counts = histogram.collect()[('venues',)]
+    assert sum(counts[:-1]) == 501
+    assert round(counts[-1], 6) == round(501 * 0.003, 6)
+
+
+def test_streamed_pages_record_render_time(client, sample_data):
+    def rendered(template):
+        metrics = client.get('/metrics').get_data(as_text=True)
+        match = re.search(
+            r'^fyyur_template_render_duration_seconds_count'
+            rf'{{template="{re.escape(template)}"}} (\d+)$', metrics, re.M)
+        return int(match.group(1)) if match else 0
+
+    before = rendered('pages/venues.html'), rendered('pages/artists.html')
+    client.get('/venues').get_data()
+    client.get('/artists').get_data()
+    after = rendered('pages/venues.html'), rendered('pages/artists.html')
+    assert after == (before[0] + 1, before[1] + 1)
@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import get_page_cache
+
+
+def test_past_page_is_clamped(client, sample_data):
+    venue_id = sample_data.venue_ids[0]
+    for past_page in ('99999999999999999999', '0', '-3'):
+        response = client.get(f'/venues/{venue_id}?past_page={past_page}')
+        assert response.status_code == 200
+
+
+def test_cache_stats_count_concurrent_lookups(app):
+    with app.app_context():
+        page_cache = get_page_cache()
+    with ThreadPoolExecutor(8) as pool:
+        for _ in pool.map(lambda n: page_cache.record(hit=n % 2 == 0),
+                          range(8000)):
+            pass
+    assert page_cache.stats() == {'hits': 4000, 'misses': 4000,
+                                  'hit_ratio': 0.5}
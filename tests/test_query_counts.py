@@ -0,0 +1,28 @@
+"""Statements per page, so an N+1 query does not creep back in."""
+
+
+def test_venues_listing(client, sample_data, count_queries):
+    response, queries = count_queries(client, '/venues')
+    assert response.status_code == 200
+    assert queries <= 2
+
+
+def test_venue_page(client, sample_data, count_queries):
+    response, queries = count_queries(
+        client, f'/venues/{sample_data.venue_ids[0]}')
+    assert response.status_code == 200
+    assert queries <= 7
+
+
+def test_artist_page(client, sample_data, count_queries):
+    response, queries = count_queries(
+        client, f'/artists/{sample_data.artist_ids[0]}')
+    assert response.status_code == 200
+    assert queries <= 7
+
+
+def test_venue_page_with_past_page(client, sample_data, count_queries):
+    response, queries = count_queries(
+        client, f'/venues/{sample_data.venue_ids[0]}?past_page=2')
+    assert response.status_code == 200
+    assert queries <= 7
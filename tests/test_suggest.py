@@ -0,0 +1,57 @@
+import threading
+import time
+
+from sqlalchemy import update
+
+from models import Venue, db
+from suggest import PrefixIndex, get_suggest_index
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_lookups_never_wait_for_a_build(app, client, sample_data,
+                                        monkeypatch):
+    release, builds = threading.Event(), []
+    build = PrefixIndex._build
+
+    def slow_build(index):
+        builds.append(index)
+        release.wait(5)
+        build(index)
+
+    monkeypatch.setattr(PrefixIndex, '_build', slow_build)
+    with app.app_context():
+        index = get_suggest_index()
+
+    # The first lookup starts the refresher and is answered meanwhile.
+    response = client.get('/api/suggest?q=venue&kind=venue')
+    assert response.json['source'] == 'database'
+    assert len(response.json['data']) == 6
+    release.set()
+    wait_for(lambda: index.fits)
+    assert client.get('/api/suggest?q=venue').json['source'] == 'index'
+
+    # A rebuild in progress leaves the previous entries serving.
+    release.clear()
+    with app.app_context():
+        db.session.execute(update(Venue).values(name='Renamed'))
+        db.session.commit()
+
+    def rebuild_index():
+        with app.app_context():
+            index.build()
+
+    rebuild = threading.Thread(target=rebuild_index)
+    rebuild.start()
+    wait_for(lambda: len(builds) == 2)
+    response = client.get('/api/suggest?q=venue&kind=venue')
+    assert response.json['source'] == 'index'
+    assert len(response.json['data']) == 6
+    release.set()
+    rebuild.join()
+    assert client.get('/api/suggest?q=venue&kind=venue').json['data'] == []
@@ -1,28 +1,195 @@
+import base64
+import binascii
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event, insert, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import Area, Genre, db
+
+
+class LookupCache:
+    """Thread-safe, bounded LRU mapping of lookup keys to row ids.
+
+    Rows created inside a transaction are only published once it commits,
+    and any rollback drops the whole cache so a stale id can never outlive
+    the failure it caused.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+area_cache = LookupCache()
+genre_cache = LookupCache()
+
+
+def _pending(session):
+    return session.info.setdefault('lookup_cache_pending', [])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_pending(session):
+    for cache, key, value in session.info.pop('lookup_cache_pending', []):
+        cache.put(key, value)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _invalidate_lookup_caches(session):
+    session.info.pop('lookup_cache_pending', None)
+    area_cache.clear()
+    genre_cache.clear()
+
+
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def _dialect_insert(db):
+    return DIALECT_INSERTS.get(db.session.get_bind().dialect.name)
+
+
+def _insert_ignoring_conflicts(db, model, rows):
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        stmt = insert(model)
+    else:
+        stmt = dialect_insert(model).on_conflict_do_nothing()
+    db.session.execute(stmt, rows)
+
 
-from models import Area, Genre
+def _cached_instance(db, model, **values):
+    # Attach a row known to exist without a SELECT; the identity map wins if
+    # the session already holds it.
+    obj = model(**values)
+    make_transient_to_detached(obj)
+    return db.session.merge(obj, load=False)
+
+
+def _upsert_areas(db, keys):
+    """Insert or fetch areas in one ``INSERT ... ON CONFLICT ... RETURNING``.
+
+    The no-op ``DO UPDATE`` makes already existing rows come back as well,
+    so concurrent writers all converge on the row the unique index allows.
+    """
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        _insert_ignoring_conflicts(
+            db, Area, [{'city': city, 'state': state} for city, state in keys])
+        return db.session.query(Area.id, Area.city, Area.state).filter(
+            tuple_(Area.city, Area.state).in_(keys)).all()
+
+    stmt = dialect_insert(Area).values(
+        [{'city': city, 'state': state} for city, state in keys])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Area.city, Area.state],
+        set_={'city': stmt.excluded.city}
+    ).returning(Area.id, Area.city, Area.state)
+    return db.session.execute(stmt).all()
+
+
+def get_or_create_areas(keys, db):
+    """Return a ``{(city, state): area_id}`` map, creating missing areas.
+
+    Cached keys cost nothing and all misses share one upsert round trip.
+    """
+    keys = list(dict.fromkeys(keys))
+    ids = {key: area_cache.get(key) for key in keys}
+    missing = [key for key, area_id in ids.items() if area_id is None]
+    if missing:
+        for area_id, city, state in _upsert_areas(db, missing):
+            ids[(city, state)] = area_id
+            _pending(db.session).append((area_cache, (city, state), area_id))
+    return ids
 
 
 def get_or_create_area(city, state, db):
-    area = Area.query.filter_by(city=city, state=state).first()
-    if not area:
-        area = Area(city=city, state=state)
-        db.session.add(area)
-        db.session.flush()
-    return area
+    area_id = get_or_create_areas([(city, state)], db)[(city, state)]
+    return _cached_instance(db, Area, id=area_id, city=city, state=state)
 
 
-def get_or_create_genre(genre_name, db):
+def get_or_create_genres(genre_names, db):
+    """Return ``Genre`` rows for ``genre_names``, creating missing ones.
+
+    Cache misses are resolved with one ``IN`` query and created with one
+    conflict-ignoring bulk insert, so concurrent writers racing on the same
+    genre name both end up with the single row that won.
+    """
     try:
-        genre = Genre.query.filter_by(name=genre_name).first()
-        if not genre:
-            genre = Genre(name=genre_name)
-            db.session.add(genre)
-            db.session.flush()
-        return genre
+        names = list(dict.fromkeys(genre_names))
+        ids = {name: genre_cache.get(name) for name in names}
+        missing = [name for name, genre_id in ids.items() if genre_id is None]
+
+        if missing:
+            rows = db.session.query(Genre.id, Genre.name).filter(
+                Genre.name.in_(missing)).all()
+            for genre_id, name in rows:
+                ids[name] = genre_id
+                genre_cache.put(name, genre_id)
+            to_create = [name for name in missing if ids[name] is None]
+
+            if to_create:
+                _insert_ignoring_conflicts(
+                    db, Genre, [{'name': name} for name in to_create])
+                rows = db.session.query(Genre.id, Genre.name).filter(
+                    Genre.name.in_(to_create)).all()
+                for genre_id, name in rows:
+                    ids[name] = genre_id
+                    _pending(db.session).append((genre_cache, name, genre_id))
+
+        return [_cached_instance(db, Genre, id=ids[name], name=name)
+                for name in names]
     except SQLAlchemyError:
         db.session.rollback()
         raise
-    except Exception:
-        db.session.rollback()
-        raise
+
+
+def get_or_create_genre(genre_name, db):
+    return get_or_create_genres([genre_name], db)[0]
+
+
+def encode_cursor(start_time, show_id):
+    raw = f'{start_time.isoformat()}|{show_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Turn a cursor from a query string back into ``(start_time, id)``.
+
+    Malformed cursors yield ``None`` so the listing restarts at page one.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_time, show_id = base64.urlsafe_b64decode(
+            padded).decode().split('|')
+        return datetime.fromisoformat(start_time), int(show_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
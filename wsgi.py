@@ -0,0 +1,8 @@
+# ----------------------------------------------------------------------------#
+# WSGI entry point, e.g.:
+#   gunicorn --workers 4 --preload wsgi:app
+#   uwsgi --http :5000 --master --processes 4 --module wsgi:app
+# ----------------------------------------------------------------------------#
+from app import create_app
+
+app = create_app()